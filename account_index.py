@@ -0,0 +1,173 @@
+"""
+account_index.py
+
+Sorted views of the accounts for the admin dashboard.
+
+    index = account_index.for_repository(ACCOUNTS)
+    index.query("portfolio", PRICES, descending=True, limit=100)   # top 100 portfolios
+    index.query("balance", PRICES, text="gmail", offset=100, limit=100)
+
+Sort keys are "balance", "created", "portfolio" (total value) and one per
+sector key ("auto", "steel", ...) for that sector's value.  Each key is a
+list of (value, email) pairs kept sorted with bisect.  It is built the
+first time the key is queried and after that kept current from the
+repository's change notifications, so a query walks only as far into the
+order as the requested page (plus rows skipped by the text filter).
+
+Values depend on prices; the portfolio and sector orders are rebuilt when
+the prices passed in differ from the ones they were built with.  Live
+prices move every tick, so the dashboard values at priced(PRICES): a
+snapshot of the live prices refreshed at most every REPRICE_SECONDS.  A
+wholesale reload of the accounts (another process wrote) drops every
+order, to be rebuilt on the next query.
+
+    prices = index.priced(PRICES)
+    index.query("portfolio", prices, descending=True)
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left, insort
+
+import holdings
+import instruments
+import valuation
+
+SORT_KEYS = ["balance", "portfolio"] + [s.key for s in instruments.SECTORS] + ["created"]
+SORT_LABELS = {"balance": "Balance", "portfolio": "Total Portfolio", "created": "Created",
+               **{s.key: f"{s.label} Value" for s in instruments.SECTORS}}
+VALUE_KEYS = set(SORT_KEYS) - {"balance", "created"}
+_SECTOR_COLUMN = {key: i for i, key in enumerate(valuation.SECTOR_KEYS)}
+REPRICE_SECONDS = float(os.environ.get("INVESTKARO_REPRICE_SECONDS", "30"))
+
+
+def account_values(account, prices):
+    """{sector key: value, "portfolio": total} for one account."""
+    qty = holdings.decode_account(account)["holdings"].qty
+    values = dict.fromkeys(valuation.SECTOR_KEYS, 0)
+    for symbol, inst in instruments.INSTRUMENTS.items():
+        if qty[inst.slot]:
+            values[inst.sector] += qty[inst.slot] * prices.get(symbol, 0)
+    values["portfolio"] = sum(values.values())
+    return values
+
+
+class AccountIndex:
+    def __init__(self, repo):
+        self.repo = repo
+        self._lock = threading.RLock()
+        self._orders = {}        # key -> sorted [(value, email)]
+        self._values = {}        # key -> {email: value}, to find an entry again on update
+        self._prices = None      # price vector the value orders were built with
+        self._snapshot = None    # (taken at, {symbol: price}) handed out by priced()
+        self.book = valuation.for_repository(repo)
+        repo.subscribe(self._changed)
+
+    # -- maintenance --
+    def _changed(self, email, account):
+        with self._lock:
+            if email is None:
+                self._orders.clear()
+                self._values.clear()
+                return
+            computed = None
+            for key, order in self._orders.items():
+                if key == "balance":
+                    value = account.get("balance", 0)
+                elif key == "created":
+                    value = account.get("created") or ""
+                else:
+                    if computed is None:
+                        computed = account_values(account, dict(zip(instruments.PRICE_SLOTS, self._prices)))
+                    value = computed[key]
+                values = self._values[key]
+                old = values.get(email)
+                if old is not None:
+                    if old == value:
+                        continue
+                    del order[bisect_left(order, (old, email))]
+                values[email] = value
+                insort(order, (value, email))
+
+    def _build(self, key, prices, users):
+        if key == "balance":
+            values = {email: user.get("balance", 0) for email, user in users.items()}
+        elif key == "created":
+            values = {email: user.get("created") or "" for email, user in users.items()}
+        else:
+            def column(book):
+                values = book.user_values(prices) if key == "portfolio" else book.sector_values(prices)[:, _SECTOR_COLUMN[key]]
+                return dict(zip(book.emails, values.tolist()))
+            values = self.book.read(column, users)
+        self._values[key] = values
+        self._orders[key] = sorted((value, email) for email, value in values.items())
+
+    def _order(self, key, prices, users):
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {key!r} (expected one of {', '.join(SORT_KEYS)})")
+        if key in VALUE_KEYS:
+            vector = tuple(prices.get(symbol, 0) for symbol in instruments.PRICE_SLOTS)
+            if vector != self._prices:
+                for stale in VALUE_KEYS:
+                    self._orders.pop(stale, None)
+                    self._values.pop(stale, None)
+                self._prices = vector
+        if key not in self._orders:
+            self._build(key, prices, users)
+        return self._orders[key]
+
+    # -- queries --
+    def priced(self, prices):
+        """A fixed copy of prices (live ones, usually), re-taken at most every REPRICE_SECONDS.
+
+        Querying with it reuses the value orders instead of rebuilding them every tick.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None or now - self._snapshot[0] >= REPRICE_SECONDS:
+                self._snapshot = (now, {symbol: prices.get(symbol, 0) for symbol in instruments.PRICE_SLOTS})
+            return self._snapshot[1]
+
+    def query(self, key, prices, descending=False, text="", offset=0, limit=100):
+        """([(email, value)], more) - one page of accounts in key order.
+
+        text keeps only accounts whose email or name contains it (case-insensitive).
+        more tells whether another page follows.
+        """
+        # Read the accounts before taking our lock: the repository may deliver
+        # change notifications (which take it) from inside all()
+        users = self.repo.all()
+        with self._lock:
+            order = self._order(key, prices, users)
+            walk = reversed(order) if descending else iter(order)
+            needle = text.strip().lower()
+            page, skipped = [], 0
+            for value, email in walk:
+                if needle:
+                    user = users.get(email) or {}
+                    if needle not in email.lower() and needle not in str(user.get("name", "")).lower():
+                        continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                if len(page) == limit:
+                    return page, True
+                page.append((email, value))
+            return page, False
+
+    def top(self, key, prices, n=100):
+        return [email for email, _ in self.query(key, prices, descending=True, limit=n)[0]]
+
+
+# One index per repository
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def for_repository(repo):
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(repo)
+        if index is None:
+            index = _INDEXES[repo] = AccountIndex(repo)
+        return index
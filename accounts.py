@@ -0,0 +1,233 @@
+"""
+accounts.py
+
+Process-wide account cache in front of a storage backend.
+
+The repository parses the accounts once and reloads only when the
+backend's signature (inode/mtime/size for JSON, PRAGMA data_version for
+SQLite) shows another process wrote.  Changed accounts are marked dirty
+and flush() writes just those.
+
+update() is for trades: it applies the mutation to a copy and stores it
+with compare-and-swap on the account's "rev" counter, re-running the
+mutation if another window or process changed the account first.
+
+    ACCOUNTS = accounts.get_repository()
+    ACCOUNTS.update(email, lambda account: ...)
+"""
+
+import copy
+import threading
+
+import holdings
+import storage
+
+CAS_RETRIES = 8
+
+
+class ConflictError(Exception):
+    """An account kept changing underneath update() and it gave up retrying."""
+
+
+class AccountRepository:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.RLock()
+        self._users = None
+        self._signature = None
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.accounts_written = 0
+        self.conflicts = 0
+        self._listeners = []
+        self._events = []                       # (email, account) waiting for _deliver()
+        self._deliver_lock = threading.RLock()  # keeps deliveries in the order they happened
+
+    # -- change notifications --
+    def subscribe(self, listener):
+        """Call listener(email, account) after every change made through this repository,
+        and listener(None, None) when accounts were reloaded wholesale (another process wrote).
+
+        Listeners run after the repository lock is released, so they may take
+        their own locks (and call back into the repository) without deadlocking.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, email, account):
+        # Called with self._lock held; _deliver() hands it on once the lock is released
+        self._events.append((email, account))
+
+    def _deliver(self):
+        if not self._events:
+            return
+        with self._deliver_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            for email, account in events:
+                for listener in self._listeners:
+                    listener(email, account)
+
+    # -- reads --
+    def _ensure_loaded(self):
+        sig = self.backend.signature()
+        if self._users is not None and sig == self._signature:
+            self.hits += 1
+            return
+        self.misses += 1
+        users = self.backend.load_users()
+        # Keep our unflushed changes on top of whatever another process wrote
+        if self._users is not None:
+            for email in self._dirty:
+                if email in self._users:
+                    users[email] = self._users[email]
+        self._users = users
+        self._signature = sig
+        self._notify(None, None)
+
+    def all(self):
+        with self._lock:
+            self._ensure_loaded()
+            users = self._users
+        self._deliver()
+        return users
+
+    def get(self, email):
+        with self._lock:
+            self._ensure_loaded()
+            user = self._users.get(email)
+        self._deliver()
+        return user
+
+    def __contains__(self, email):
+        return self.get(email) is not None
+
+    # -- writes --
+    def put(self, email, user):
+        with self._lock:
+            self._ensure_loaded()
+            holdings.decode_account(user)
+            user["rev"] = storage.account_rev(user) + 1
+            self._users[email] = user
+            self._dirty.add(email)
+            self._notify(email, user)
+        self._deliver()
+
+    def mark_dirty(self, email):
+        with self._lock:
+            self._dirty.add(email)
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty = {email: self._users[email] for email in self._dirty if email in self._users}
+            # None back means someone else wrote too; the next read reloads
+            self._signature = self.backend.save_accounts(dirty, self._users, self._signature)
+            self._dirty.clear()
+            self.flushes += 1
+            self.accounts_written += len(dirty)
+            return len(dirty)
+
+    def _swap(self, swaps):
+        ok = self._swap_locked(swaps)
+        self._deliver()
+        return ok
+
+    def _swap_locked(self, swaps):
+        # swaps: {email: (expected_rev, new account)}, stored all-or-nothing
+        with self._lock:
+            if self._dirty.intersection(swaps):
+                self.flush()
+            ok, sig = self.backend.compare_and_swap_many(swaps, self._users, self._signature)
+            if not ok:
+                self.conflicts += 1
+                self._signature = None  # make the retry read the accounts fresh
+                return False
+            if self._users is not None:
+                for email, (_, user) in swaps.items():
+                    self._users[email] = user
+                    self._notify(email, user)
+            self._signature = sig
+            return True
+
+    def update(self, email, mutate, retries=CAS_RETRIES):
+        """Apply mutate(account) and store it with compare-and-swap, retrying on conflict.
+
+        mutate works on a copy; raising from it aborts without writing.
+        Returns the stored account.
+        """
+        for _ in range(retries + 1):
+            current = self.get(email)
+            if current is None:
+                raise KeyError(email)
+            expected = storage.account_rev(current)
+            account = copy.deepcopy(current)
+            mutate(account)
+            if self._swap({email: (expected, account)}):
+                return account
+        raise ConflictError(f"Account {email} changed {retries + 1} times while updating; try again.")
+
+    def update_many(self, emails, mutate, retries=CAS_RETRIES):
+        """Like update(), but mutate({email: account}) and store every account in one transaction."""
+        for _ in range(retries + 1):
+            expected, copies = {}, {}
+            for email in emails:
+                current = self.get(email)
+                if current is None:
+                    raise KeyError(email)
+                expected[email] = storage.account_rev(current)
+                copies[email] = copy.deepcopy(current)
+            mutate(copies)
+            if self._swap({email: (expected[email], copies[email]) for email in copies}):
+                return copies
+        raise ConflictError(f"Accounts changed {retries + 1} times while updating; try again.")
+
+    def create(self, email, user):
+        """Add a new account; False if the email is already taken (checked atomically)."""
+        return self._swap({email: (None, holdings.decode_account(user))})
+
+    def save(self, email, user):
+        self.put(email, user)
+        self.flush()
+
+    def close(self):
+        self.flush()
+        self.backend.close()
+
+    def invalidate(self):
+        with self._lock:
+            self.flush()
+            self._users = None
+            self._signature = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "dirty": len(self._dirty),
+                "flushes": self.flushes,
+                "accounts_written": self.accounts_written,
+                "conflicts": self.conflicts,
+            }
+
+
+# One repository per storage location for the whole process.  Streamlit
+# re-executes its script on every interaction, so the cache has to live
+# here rather than in the front-end module.
+_REPOSITORIES = {}
+_REPOSITORIES_LOCK = threading.Lock()
+
+
+def get_repository(kind=None, db_file=storage.DB_FILE, reg_file=storage.REG_FILE,
+                   sqlite_file=storage.SQLITE_FILE, reg_log_file=storage.REG_LOG_FILE):
+    kind = (kind or storage.STORAGE_BACKEND).lower()
+    key = (kind, db_file, reg_file, sqlite_file, reg_log_file)
+    with _REPOSITORIES_LOCK:
+        repo = _REPOSITORIES.get(key)
+        if repo is None:
+            backend = storage.get_backend(kind, db_file, reg_file, sqlite_file, reg_log_file)
+            repo = _REPOSITORIES[key] = AccountRepository(backend)
+        return repo
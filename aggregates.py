@@ -0,0 +1,198 @@
+"""
+aggregates.py
+
+Running app-wide totals: number of users, total cash balance and shares
+outstanding per symbol.
+
+The trading engine reports each committed buy, sell, signup and withdrawal
+here as a delta, so an estimate costs one pass over the symbol list
+however many users there are:
+
+    totals = aggregates.for_repository(ACCOUNTS)
+    totals.estimate(PRICES)    # same keys as fpe.app_point_estimation
+
+The first use seeds the totals with a full scan.  A background job
+re-scans every RECONCILE_SECONDS to pick up changes made outside the
+engine (other processes), reports any drift and resets the totals.
+"""
+
+import os
+import sys
+import threading
+from array import array
+
+import numpy as np
+
+import holdings
+import instruments
+import valuation
+
+RECONCILE_SECONDS = float(os.environ.get("INVESTKARO_RECONCILE_SECONDS", "300"))  # 0 = never
+RECONCILE_RETRIES = 3
+
+
+class AppAggregates:
+    def __init__(self, repo, reconcile_seconds=RECONCILE_SECONDS):
+        self.repo = repo
+        # Held by the engine across commit + delta so a re-scan can't count a trade twice
+        self.lock = threading.RLock()
+        self._ready = False
+        self._generation = 0      # bumped by every delta, so reconcile() can tell one landed during its scan
+        self.num_users = 0
+        self.balance_paise = 0    # cash is summed in integer paise, so running and scanned totals match exactly
+        self.outstanding = array("q", bytes(8 * holdings.N_SLOTS))
+        self.reconciles = 0
+        self.last_drift = None
+        self._reconciler = Reconciler(self, reconcile_seconds) if reconcile_seconds > 0 else None
+
+    # -- full scan --
+    def _scan(self):
+        book = valuation.PortfolioMatrix(dict(self.repo.all()))
+        balance_paise = int(np.rint(np.asarray(book.balances, dtype=np.float64) * 100).sum()) if len(book) else 0
+        return len(book), balance_paise, array("q", book.outstanding().tolist())
+
+    def _ensure_seeded(self):
+        if not self._ready:
+            self.num_users, self.balance_paise, self.outstanding = self._scan()
+            self._ready = True
+
+    def reconcile(self, retries=RECONCILE_RETRIES):
+        """Re-scan every account; returns {field: (running, scanned)} for anything that drifted.
+
+        The scan runs without self.lock, so trades aren't held up behind it.  Its
+        result is applied only if no delta arrived meanwhile; after `retries`
+        such races the last scan is done with the lock held.
+        """
+        for attempt in range(retries + 1):
+            locked = attempt == retries
+            if locked:
+                self.lock.acquire()
+            try:
+                with self.lock:
+                    generation = self._generation
+                scanned = self._scan()
+                with self.lock:
+                    if self._generation == generation:
+                        return self._apply_scan(*scanned)
+            finally:
+                if locked:
+                    self.lock.release()
+
+    def _apply_scan(self, num_users, balance_paise, outstanding):
+        # Called with self.lock held
+        drift = {}
+        if self._ready:
+            if num_users != self.num_users:
+                drift["num_users"] = (self.num_users, num_users)
+            if balance_paise != self.balance_paise:
+                drift["total_balance"] = (_rupees(self.balance_paise), _rupees(balance_paise))
+            for slot, (running, scanned) in enumerate(zip(self.outstanding, outstanding)):
+                if running != scanned:
+                    drift[instruments.PRICE_SLOTS[slot]] = (running, scanned)
+            self.reconciles += 1
+            self.last_drift = drift
+        self.num_users, self.balance_paise, self.outstanding = num_users, balance_paise, outstanding
+        self._ready = True
+        return drift
+
+    # -- deltas, reported after the change is committed (with self.lock held around both) --
+    def _shares(self, symbol, qty):
+        slot = holdings.SLOT_OF.get(symbol)
+        if slot is not None:
+            self.outstanding[slot] += qty
+
+    def trade(self, side, symbol, qty, amount):
+        with self.lock:
+            self._generation += 1
+            if not self._ready:
+                return  # the seeding scan will include it
+            if side == "BUY":
+                self.balance_paise -= _paise(amount)
+                self._shares(symbol, qty)
+            else:
+                self.balance_paise += _paise(amount)
+                self._shares(symbol, -qty)
+
+    def signup(self, account):
+        with self.lock:
+            self._generation += 1
+            if not self._ready:
+                return
+            self.num_users += 1
+            self.balance_paise += _paise(account.get("balance", 0))
+            for symbol, qty in holdings.decode_account(account)["holdings"].items():
+                self._shares(symbol, qty)
+
+    def withdrawal(self, amount):
+        with self.lock:
+            self._generation += 1
+            if self._ready:
+                self.balance_paise += _paise(amount)
+
+    # -- reads --
+    @property
+    def total_balance(self):
+        return _rupees(self.balance_paise)
+
+    def estimate(self, prices):
+        with self.lock:
+            self._ensure_seeded()
+            total_portfolio_value = round(sum(qty * prices.get(symbol, 0)
+                                              for symbol, qty in zip(instruments.PRICE_SLOTS, self.outstanding) if qty), 2)
+            return {
+                "num_users": self.num_users,
+                "total_balance": self.total_balance,
+                "total_portfolio_value": total_portfolio_value,
+                "total_money_in_app": round(self.total_balance + total_portfolio_value, 2),
+            }
+
+    def close(self):
+        if self._reconciler is not None:
+            self._reconciler.close()
+
+
+def _paise(amount):
+    return int(round(amount * 100))
+
+
+def _rupees(paise):
+    return paise // 100 if paise % 100 == 0 else paise / 100
+
+
+class Reconciler:
+    """Background job that periodically re-scans accounts and corrects the running totals."""
+
+    def __init__(self, aggregates, interval):
+        self.aggregates = aggregates
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="aggregates-reconcile", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if not self.aggregates._ready:
+                continue  # nothing has asked for totals yet
+            try:
+                drift = self.aggregates.reconcile()
+            except Exception as exc:
+                print(f"[aggregates] reconcile failed: {exc}", file=sys.stderr)
+                continue
+            if drift:
+                print(f"[aggregates] corrected drift in {len(drift)} totals: {drift}", file=sys.stderr)
+
+    def close(self):
+        self._stopped.set()
+
+
+# One set of totals per repository, shared by every engine on it
+_AGGREGATES = {}
+_AGGREGATES_LOCK = threading.Lock()
+
+
+def for_repository(repo):
+    with _AGGREGATES_LOCK:
+        totals = _AGGREGATES.get(repo)
+        if totals is None:
+            totals = _AGGREGATES[repo] = AppAggregates(repo)
+        return totals
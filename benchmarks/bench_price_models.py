@@ -0,0 +1,68 @@
+"""
+bench_price_models.py
+
+Cost per simulated tick of each price_models model for large universes:
+one paths.BLOCK of candles is generated for m symbols and the time is
+divided by the block length.
+
+Run from the repo root:
+    python benchmarks/bench_price_models.py                   # 1k, 5k symbols
+    python benchmarks/bench_price_models.py --symbols 100,10000 --models gbm,sector
+
+The sector model puts symbols into --sectors equal groups; its Cholesky
+factor is computed once up front and reported separately.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import paths  # noqa: E402
+import price_models  # noqa: E402
+
+
+def build(name, symbols, n_sectors):
+    params = {"symbols": symbols}
+    if name == "sector":
+        params["sectors"] = [i % n_sectors for i in range(len(symbols))]
+    return price_models.get_model(name, **params)
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", default="1000,5000")
+    parser.add_argument("--models", default=",".join(price_models.MODELS))
+    parser.add_argument("--sectors", type=int, default=20)
+    parser.add_argument("--block", type=int, default=paths.BLOCK)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'model':>7} {'symbols':>8} {'setup s':>8} {'block s':>8} {'us/tick':>9}")
+    for m in (int(s) for s in args.symbols.split(",")):
+        symbols = [f"SYM{i}" for i in range(m)]
+        start_prices = np.random.default_rng(0).uniform(5, 500, size=m)
+        for name in args.models.split(","):
+            setup_t = best_of(1, build, name, symbols, args.sectors)
+            model = build(name, symbols, args.sectors)
+            rng = np.random.default_rng(1)
+            block_t = best_of(args.repeat, model.candles, start_prices, args.block, rng)
+            print(f"{name:>7} {m:>8} {setup_t:>8.3f} {block_t:>8.4f} {block_t / args.block * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
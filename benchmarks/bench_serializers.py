@@ -0,0 +1,81 @@
+"""
+bench_serializers.py
+
+Save/load time and file size of each account-database format for
+synthetic account sets.
+
+Run from the repo root:
+    python benchmarks/bench_serializers.py                 # 1k, 100k, 1M accounts
+    python benchmarks/bench_serializers.py --sizes 1000,100000
+
+1M accounts in the legacy dict layout needs several GB of RAM.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serializers  # noqa: E402
+
+SECTORS = {
+    "shares": ["Honda", "Hyundai", "Tata Motors", "Mahindra & Mahindra", "Maruti Suzuki", "Ashok Leyland"],
+    "petroleum_shares": ["Reliance Industries", "Indian Oil Corporation", "Bharat Petroleum",
+                         "Hindustan Petroleum", "Oil India"],
+    "steel_shares": ["Tata Steel", "JSW Steel", "Steel Authority of India (SAIL)",
+                     "Jindal Steel & Power", "NMDC Steel"],
+    "gold_shares": ["Titan", "Muthoot Finance", "Manappuram Finance", "Rajesh Exports", "PC Jeweller"],
+}
+
+
+def synthetic_users(n, seed=0):
+    rng = random.Random(seed)
+    users = {}
+    for i in range(n):
+        user = {
+            "name": f"user{i}",
+            "password": "secret1",
+            "balance": rng.randint(0, 5000),
+            "last_buy_price": {},
+            "bonus": 100,
+            "created": "2024-01-01 10:00:00.000000",
+        }
+        for bucket, companies in SECTORS.items():
+            # Mostly-zero positions, like real accounts
+            user[bucket] = {c: (rng.randint(1, 50) if rng.random() < 0.1 else 0) for c in companies}
+        users[f"user{i}@example.com"] = user
+    return users
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--formats", default=",".join(serializers.available()))
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    formats = args.formats.split(",")
+
+    print(f"{'accounts':>9} {'format':>8} {'save s':>9} {'load s':>9} {'size MB':>9}")
+    for n in sizes:
+        users = synthetic_users(n)
+        for name in formats:
+            ser = serializers.get_serializer(name)
+            save_t, data = timed(ser.dumps, users)
+            load_t, loaded = timed(ser.loads, data)
+            assert loaded == users, f"{name} did not round-trip"
+            print(f"{n:>9} {name:>8} {save_t:>9.3f} {load_t:>9.3f} {len(data) / 1e6:>9.2f}")
+        del users
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+bench_startup.py
+
+Import-time budget for the desktop app: runs `python -X importtime -c
+"import final"` in a fresh interpreter and reports how long final.py
+takes to import, its heaviest direct imports, and whether any of the
+chart/image/dataframe libraries were pulled in.  Those load on first use
+(the chart window, the logo, the admin export), so the login window does
+not wait for them.
+
+Run from the repo root:
+    python benchmarks/bench_startup.py                   # best of 5 against the budget
+    python benchmarks/bench_startup.py --budget-ms 300 --top 15
+
+Exits non-zero if a deferred module is imported at startup or the best
+run is over the budget, so it can gate a change.
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by `import final`
+DEFERRED = ("matplotlib", "mplfinance", "pandas", "PIL", "pyarrow")
+BUDGET_MS = 400
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+def importtime(module):
+    """[(self_us, cumulative_us, depth, name)] for one fresh `import module`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cum_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cum_us), len(indent) // 2, name))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="final")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.repeat):
+        rows = importtime(args.module)
+        total = next(cum for _, cum, depth, name in rows if depth == 0 and name == args.module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+
+    print(f"import {args.module}: {total / 1000:.1f} ms (best of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14}  direct import")
+    direct = sorted((r for r in rows if r[2] == 1), key=lambda r: r[1], reverse=True)
+    for _, cum, _, name in direct[:args.top]:
+        print(f"{cum / 1000:>14.1f}  {name}")
+
+    loaded = sorted({name for *_, name in rows if name.split(".")[0] in DEFERRED})
+    failed = False
+    if loaded:
+        print(f"FAIL: deferred modules imported at startup: {', '.join(loaded[:10])}")
+        failed = True
+    if total / 1000 > args.budget_ms:
+        print(f"FAIL: {total / 1000:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
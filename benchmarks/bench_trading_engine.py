@@ -0,0 +1,80 @@
+"""
+bench_trading_engine.py
+
+Headless load test for trading_engine.TradingEngine: one-at-a-time
+buy/sell calls versus batch_execute() over the same random orders, on a
+throwaway copy of each storage backend.
+
+Run from the repo root:
+    python benchmarks/bench_trading_engine.py --accounts 1000 --orders 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+import accounts  # noqa: E402
+import trading_engine  # noqa: E402
+from bench_serializers import SECTORS, synthetic_users  # noqa: E402
+
+PRICES = {c: 10 + 5 * i for i, companies in enumerate(SECTORS.values()) for c in companies}
+
+
+def random_orders(emails, n, seed=1):
+    rng = random.Random(seed)
+    symbols = list(PRICES)
+    return [trading_engine.Order(rng.choice(emails), rng.choice((trading_engine.BUY, trading_engine.SELL)),
+                                 rng.choice(symbols), rng.randint(1, 5))
+            for _ in range(n)]
+
+
+def run(kind, n_accounts, n_orders, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = dict(db_file=os.path.join(tmp, "users.json"), reg_file=os.path.join(tmp, "registrations.json"),
+                     sqlite_file=os.path.join(tmp, "bench.db"), reg_log_file=os.path.join(tmp, "registrations.jsonl"),
+                     shard_dir=os.path.join(tmp, "accounts"))
+        backend = storage.get_backend(kind, **paths)
+        backend.save_users(synthetic_users(n_accounts))
+        repo = accounts.AccountRepository(backend)
+        engine = trading_engine.TradingEngine(repo, PRICES, SECTORS)
+        orders = random_orders(list(repo.all()), n_orders)
+
+        start = time.perf_counter()
+        for o in orders:
+            try:
+                (engine.buy if o.side == trading_engine.BUY else engine.sell)(o.email, o.symbol, o.qty)
+            except trading_engine.TradeError:
+                pass
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(0, len(orders), batch_size):
+            engine.batch_execute(orders[i:i + batch_size])
+        batched = time.perf_counter() - start
+        backend.close()
+    return single, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--backends", default="json,sqlite,sharded")
+    args = parser.parse_args()
+
+    print(f"{args.accounts} accounts, {args.orders} orders, batches of {args.batch}")
+    print(f"{'backend':>8} {'single ord/s':>13} {'batched ord/s':>14}")
+    for kind in args.backends.split(","):
+        single, batched = run(kind, args.accounts, args.orders, args.batch)
+        print(f"{kind:>8} {args.orders / single:>13.0f} {args.orders / batched:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
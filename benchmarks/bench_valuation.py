@@ -0,0 +1,126 @@
+"""
+bench_valuation.py
+
+Admin-dashboard valuation (per-user, per-sector and app-wide portfolio
+value) with valuation.PortfolioMatrix versus the per-user generator sums
+show_admin_dashboard and fpe.app_point_estimation used to run.
+
+Also times building the matrix from account dicts (what
+valuation.LiveBook pays once per process, and again after another process
+rewrites the accounts) and refreshing one account's row after a trade
+(what it pays per change from then on).
+
+Run from the repo root:
+    python benchmarks/bench_valuation.py                  # 1k, 100k, 1M accounts
+    python benchmarks/bench_valuation.py --sizes 1000,100000 --loop-max 100000
+
+The matrix is generated directly for the large sizes; the old loops are
+only timed up to --loop-max accounts since they take minutes at 1M.
+"""
+
+import os
+import sys
+import time
+import argparse
+from array import array
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import holdings  # noqa: E402
+import instruments  # noqa: E402
+import valuation  # noqa: E402
+
+PRICES = instruments.PRICES
+
+
+def synthetic_book(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Mostly-zero positions, like real accounts
+    qty = rng.integers(1, 51, size=(n, holdings.N_SLOTS))
+    qty[rng.random((n, holdings.N_SLOTS)) >= 0.1] = 0
+    emails = [f"user{i}@example.com" for i in range(n)]
+    return valuation.PortfolioMatrix.from_arrays(emails, qty, rng.integers(0, 5001, size=n))
+
+
+def legacy_users(book):
+    """The same accounts in the old per-sector dict layout."""
+    users = {}
+    for email, row, balance in zip(book.emails, book.holdings.tolist(), book.balances.tolist()):
+        user = {"balance": balance}
+        for sector in instruments.SECTORS:
+            user[sector.bucket] = {c: row[instruments.INSTRUMENTS[c].slot] for c in sector.companies}
+        users[email] = user
+    return users
+
+
+def accounts(book):
+    """The same accounts as decoded repository entries (a Holdings vector each)."""
+    return {email: {"balance": balance, "holdings": holdings.Holdings(array("q", row))}
+            for email, row, balance in zip(book.emails, book.holdings.tolist(), book.balances.tolist())}
+
+
+def update_each(book, users, n):
+    for email in list(users)[:n]:
+        book.update(email, users[email])
+
+
+def loop_valuation(users):
+    rows = []
+    total_balance = 0
+    total_portfolio_value = 0
+    for email, user in users.items():
+        total_balance += user.get("balance", 0)
+        values = [sum(shares * PRICES.get(company, 0) for company, shares in user.get(s.bucket, {}).items())
+                  for s in instruments.SECTORS]
+        rows.append(values)
+        total_portfolio_value += sum(values)
+    return rows, total_balance, total_portfolio_value
+
+
+def matrix_valuation(book):
+    return book.sector_values(PRICES), book.user_values(PRICES), book.totals(PRICES)
+
+
+def best_of(repeat, fn, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--loop-max", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--updates", type=int, default=10000, help="accounts refreshed for the update timing")
+    args = parser.parse_args()
+
+    print(f"{'accounts':>9} {'build s':>9} {'update us':>10} {'matrix s':>9} {'loops s':>9} {'speedup':>8}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        book = synthetic_book(n)
+        users = accounts(book)
+        build_t, built = best_of(1, valuation.PortfolioMatrix, users)
+        assert (built.holdings == book.holdings).all()
+        updates = min(n, args.updates)
+        update_t, _ = best_of(args.repeat, update_each, built, users, updates)
+        del users, built
+        matrix_t, (sector_values, _, totals) = best_of(args.repeat, matrix_valuation, book)
+        loop_t = None
+        if n <= args.loop_max:
+            loop_t, (rows, total_balance, total_value) = best_of(1, loop_valuation, legacy_users(book))
+            assert rows == sector_values.tolist()
+            assert (total_balance, total_value) == (totals["total_balance"], totals["total_portfolio_value"])
+        loop_col = f"{loop_t:>9.3f}" if loop_t is not None else f"{'-':>9}"
+        speedup = f"{loop_t / matrix_t:>7.0f}x" if loop_t is not None else f"{'-':>8}"
+        print(f"{n:>9} {build_t:>9.3f} {update_t / updates * 1e6:>10.1f} {matrix_t:>9.4f} {loop_col} {speedup}")
+        del book
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+candles.py
+
+Retained-mode candlestick drawing for the live chart windows.
+
+The artists are created once: a PolyCollection of candle bodies, a
+LineCollection of wicks, a status title and a corner overlay text.
+Candle i goes into slot i % capacity, so appending rewrites only one
+slot.  A tick restores the cached background and blits the artists; the
+background is redrawn only when the x range scrolls (a quarter window at
+a time) or a candle leaves the y range.
+
+    chart = CandlestickRenderer(fig, ax, capacity=200)
+    chart.append(o, h, l, c)
+    chart.set_status("Current: ...")
+    chart.set_overlay("12.5 fps")
+    chart.draw()
+"""
+
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+
+UP_COLOR = "#00b060"
+DOWN_COLOR = "#e0403a"
+BODY_WIDTH = 0.6
+
+
+class CandlestickRenderer:
+    def __init__(self, fig, ax, capacity, up_color=UP_COLOR, down_color=DOWN_COLOR, text_color="white"):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = fig.canvas
+        self.capacity = capacity
+        self.count = 0  # candles appended so far; the next one is drawn at x = count
+        self._up = np.array(to_rgba(up_color))
+        self._down = np.array(to_rgba(down_color))
+        # Per-slot state, NaN while a slot is empty
+        self._high = np.full(capacity, np.nan)
+        self._low = np.full(capacity, np.nan)
+        self._colors = np.zeros((capacity, 4))
+
+        self.bodies = PolyCollection(np.zeros((capacity, 4, 2)), closed=False, facecolors=self._colors,
+                                     edgecolors="none", animated=True)
+        self.wicks = LineCollection(np.zeros((capacity, 2, 2)), colors=self._colors,
+                                    linewidths=1, animated=True)
+        ax.add_collection(self.wicks)
+        ax.add_collection(self.bodies)
+        self.status = ax.text(0.5, 1.01, "", transform=ax.transAxes, ha="center", va="bottom",
+                              color=text_color, fontsize=11, animated=True)
+        self.overlay = ax.text(0.01, 0.99, "", transform=ax.transAxes, ha="left", va="top",
+                               color="gray", fontsize=8, family="monospace", animated=True)
+
+        self._x0 = 0
+        self._background = None
+        self._layout_pending = True
+        self._cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    # -- data --
+    def append(self, o, h, l, c):
+        i = self.count
+        slot = i % self.capacity
+        left, right = i - BODY_WIDTH / 2, i + BODY_WIDTH / 2
+        lo, hi = min(o, c), max(o, c)
+        if hi - lo < 1e-9:
+            hi = lo + 1e-9  # doji: keep a visible sliver
+        # Paths are edited in place; nothing else in the collections is rebuilt
+        self.bodies.get_paths()[slot].vertices[:] = ((left, lo), (left, hi), (right, hi), (right, lo))
+        self.wicks.get_paths()[slot].vertices[:] = ((i, l), (i, h))
+        self._colors[slot] = self._up if c >= o else self._down
+        self.bodies.set_facecolor(self._colors)
+        self.wicks.set_color(self._colors)
+        self._high[slot] = h
+        self._low[slot] = l
+        self.count += 1
+
+        x_lo, x_hi = self.ax.get_xlim()
+        y_lo, y_hi = self.ax.get_ylim()
+        if i + 0.5 > x_hi or h > y_hi or l < y_lo:
+            self._layout_pending = True
+
+    def extend(self, candles):
+        """Append many (o, h, l, c) rows, e.g. a window restored from a buffer."""
+        for o, h, l, c in candles:
+            self.append(o, h, l, c)
+
+    def set_status(self, text):
+        self.status.set_text(text)
+
+    def set_overlay(self, text):
+        self.overlay.set_text(text)
+
+    # -- drawing --
+    def _layout(self):
+        last = max(self.count - 1, 0)
+        if last + 0.5 > self._x0 + self.capacity - 0.5 or last < self._x0:
+            # Scroll so the newest candle sits three quarters of the way across
+            self._x0 = max(0, last - (self.capacity * 3) // 4)
+        self.ax.set_xlim(self._x0 - 0.5, self._x0 + self.capacity - 0.5)
+        if self.count:
+            lo, hi = np.nanmin(self._low), np.nanmax(self._high)
+            pad = max((hi - lo) * 0.1, abs(hi) * 0.01, 0.05)
+            self.ax.set_ylim(lo - pad, hi + pad)
+        self._layout_pending = False
+
+    def _on_draw(self, event):
+        # Any full draw (first show, resize, relayout) refreshes the cached background
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.wicks)
+        self.ax.draw_artist(self.bodies)
+        self.ax.draw_artist(self.status)
+        self.ax.draw_artist(self.overlay)
+
+    def draw(self):
+        """Show the latest state: a blit normally, a full redraw only when the view moved."""
+        if self._layout_pending:
+            self._layout()
+            self._background = None
+        if self._background is None:
+            self.canvas.draw()  # fires _on_draw
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+    def close(self):
+        self.canvas.mpl_disconnect(self._cid)
@@ -0,0 +1,159 @@
+"""
+chart_render.py
+
+Headless chart images (PNG or SVG bytes) rendered with the Agg backend.
+
+The Streamlit chart built a new pyplot figure on every rerun and charts
+could otherwise only be drawn inside a Tk window.  This module keeps a
+pool of Figures, one set of artists each (candle bodies, wicks, a price
+line, the entry line), and draws by updating those artists' data.  No
+pyplot and no GUI toolkit is involved, so it works from any thread and on
+servers without a display.
+
+Images of a symbol from the shared market are cached (LRU) by symbol,
+the market tick they show, size and the other render options, so repeat
+views between ticks - Streamlit reruns the whole script on every
+interaction - come straight from the cache.
+
+    png = chart_render.render_png("Honda", window=100, entry=12.5)        # candles from market.get_market()
+    svg = chart_render.render_png("Honda", kind="line", fmt="svg")
+    png = chart_render.render_ohlc(candles, kind="line", title="Dummy")   # any (n, 4|5) array, uncached
+    chart_render.cache_info()
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+import candles
+import market
+
+KINDS = ("candle", "line")
+SIZE = (8, 4)       # inches
+DPI = 100
+WINDOW = 100        # candles shown by default
+POOL_SIZE = 4       # idle figures kept per (kind, size, dpi)
+CACHE_SIZE = 128    # rendered images kept
+
+
+class PooledChart:
+    """A Figure with its artists created once; draw() only swaps their data."""
+
+    def __init__(self, kind, size, dpi):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown chart kind: {kind!r} (expected one of {', '.join(KINDS)})")
+        self.kind = kind
+        self.fig = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.ax.set_xlabel("Ticks")
+        self.ax.set_ylabel("Price")
+        self.bodies = self.wicks = self.line = None
+        if kind == "candle":
+            self.wicks = self.ax.add_collection(LineCollection([], linewidths=1))
+            self.bodies = self.ax.add_collection(PolyCollection([], edgecolors="none"))
+        else:
+            (self.line,) = self.ax.plot([], [], label="Price")
+        self.entry = self.ax.axhline(0, color="blue", linestyle="--", linewidth=1.2, visible=False)
+
+    def draw(self, ohlc, entry=None, title=None, fmt="png"):
+        ohlc = np.asarray(ohlc, dtype=np.float64)
+        n = len(ohlc)
+        x = np.arange(n)
+        o, h, l, c = (ohlc[:, i] for i in range(4))
+        if self.kind == "candle":
+            w = candles.BODY_WIDTH / 2
+            lo = np.minimum(o, c)
+            hi = np.maximum(np.maximum(o, c), lo + 1e-9)
+            self.bodies.set_verts(np.stack([np.stack([x - w, lo], -1), np.stack([x - w, hi], -1),
+                                            np.stack([x + w, hi], -1), np.stack([x + w, lo], -1)], axis=1))
+            self.wicks.set_segments(np.stack([np.stack([x, l], -1), np.stack([x, h], -1)], axis=1))
+            colors = np.where((c >= o)[:, None], candles.UP_COLOR, candles.DOWN_COLOR).ravel()
+            self.bodies.set_facecolor(colors)
+            self.wicks.set_color(colors)
+            y_lo, y_hi = (l.min(), h.max()) if n else (0, 1)
+        else:
+            self.line.set_data(x, c)
+            y_lo, y_hi = (c.min(), c.max()) if n else (0, 1)
+        if entry is not None:
+            self.entry.set_ydata([entry, entry])
+            y_lo, y_hi = min(y_lo, entry), max(y_hi, entry)
+        self.entry.set_visible(entry is not None)
+        pad = max((y_hi - y_lo) * 0.1, abs(y_hi) * 0.01, 0.05)
+        self.ax.set_xlim(-0.5, max(n, 1) - 0.5)
+        self.ax.set_ylim(y_lo - pad, y_hi + pad)
+        self.ax.set_title(title or "")
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format=fmt)
+        return buf.getvalue()
+
+
+class FigurePool:
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, kind, size, dpi):
+        key = (kind, tuple(size), dpi)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return PooledChart(kind, tuple(size), dpi)
+
+    def release(self, chart):
+        key = (chart.kind, tuple(chart.fig.get_size_inches()), chart.fig.dpi)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.size:
+                idle.append(chart)
+
+
+_POOL = FigurePool()
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0}
+
+
+def render_ohlc(ohlc, kind="candle", size=SIZE, dpi=DPI, entry=None, title=None, fmt="png"):
+    """Render (n, 4|5) OHLC rows to image bytes on a pooled figure (not cached)."""
+    chart = _POOL.acquire(kind, size, dpi)
+    try:
+        return chart.draw(ohlc, entry=entry, title=title, fmt=fmt)
+    finally:
+        _POOL.release(chart)
+
+
+def render_png(symbol, window=WINDOW, kind="candle", size=SIZE, dpi=DPI, entry=None, title=None, fmt="png", mkt=None):
+    """The last `window` candles of a market symbol as image bytes, cached until the market ticks."""
+    mkt = mkt or market.get_market()
+    key = (symbol, mkt.tick, tuple(size), kind, window, dpi, entry, title, fmt)
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            _STATS["hits"] += 1
+            return _CACHE[key]
+        _STATS["misses"] += 1
+    # Copy the rows: the ring buffer may move on while we draw
+    image = render_ohlc(np.array(mkt.history(symbol, window)), kind, size, dpi, entry, title, fmt)
+    with _CACHE_LOCK:
+        _CACHE[key] = image
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return image
+
+
+def cache_info():
+    with _CACHE_LOCK:
+        return {"hits": _STATS["hits"], "misses": _STATS["misses"], "size": len(_CACHE), "max_size": CACHE_SIZE}
+
+
+def clear_cache():
+    with _CACHE_LOCK:
+        _CACHE.clear()
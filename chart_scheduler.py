@@ -0,0 +1,134 @@
+"""
+chart_scheduler.py
+
+One Tk timer for the market and every open chart window.
+
+Each tick advances the market once, hands every registered chart the new
+data (on_tick) and marks it dirty, then queues a single render pass.
+Each chart redraws at its own pace: its frame period is chosen so that a
+redraw takes at most DRAW_BUDGET of it, within MIN_FRAME_MS..MAX_FRAME_MS,
+and ticks that arrive in between cost nothing extra.  Charts that aren't
+viewable (iconified, withdrawn) are skipped until they are mapped again.
+Views expose fps and draw_ms for an on-chart overlay.
+
+    SCHEDULER = chart_scheduler.ChartScheduler(root, MARKET, CHART_UPDATE_INTERVAL)
+    view = SCHEDULER.add(chart_win, redraw_chart, on_tick=append_candle)
+    SCHEDULER.start()
+    SCHEDULER.remove(view)    # also happens when chart_win is destroyed
+"""
+
+import time
+
+MIN_FRAME_MS = 33       # never redraw one chart more than ~30 times a second
+MAX_FRAME_MS = 2000     # nor less than every 2 s while it has changes
+DRAW_BUDGET = 0.25      # share of a chart's frame period its redraw may take
+SMOOTHING = 0.3         # weight of the newest sample in the draw-time / fps averages
+
+
+class ChartView:
+    """A registered chart window and its frame pacing."""
+
+    def __init__(self, widget, redraw, on_tick=None):
+        self.widget = widget
+        self.redraw = redraw
+        self.on_tick = on_tick
+        self.dirty = True
+        self.draw_ms = 0.0          # smoothed redraw time
+        self.frame_ms = MIN_FRAME_MS
+        self.next_due = 0.0         # perf_counter time the next redraw may happen
+        self.last_frame = None
+        self.fps = 0.0
+        self.frames = 0
+
+    def invalidate(self):
+        self.dirty = True
+
+    def visible(self):
+        try:
+            return bool(self.widget.winfo_viewable())
+        except Exception:
+            return False  # destroyed
+
+    def _drawn(self, started, finished):
+        elapsed_ms = (finished - started) * 1000
+        self.draw_ms = elapsed_ms if not self.frames else self.draw_ms + SMOOTHING * (elapsed_ms - self.draw_ms)
+        self.frame_ms = min(max(self.draw_ms / DRAW_BUDGET, MIN_FRAME_MS), MAX_FRAME_MS)
+        self.next_due = finished + self.frame_ms / 1000
+        if self.last_frame is not None:
+            rate = 1 / max(started - self.last_frame, 1e-6)
+            self.fps = rate if self.frames == 1 else self.fps + SMOOTHING * (rate - self.fps)
+        self.last_frame = started
+        self.frames += 1
+        self.dirty = False
+
+
+class ChartScheduler:
+    def __init__(self, root, market, interval_ms):
+        self.root = root
+        self.market = market
+        self.interval_ms = interval_ms
+        self.views = []
+        self._after_id = None
+        self._render_id = None
+
+    # -- registration --
+    def add(self, widget, redraw, on_tick=None):
+        view = ChartView(widget, redraw, on_tick)
+        self.views.append(view)
+        widget.bind("<Destroy>", lambda e: self.remove(view) if e.widget is widget else None, add="+")
+        # Coming back from iconified/withdrawn: show what changed while hidden
+        widget.bind("<Map>", lambda e: self.request_render() if e.widget is widget else None, add="+")
+        return view
+
+    def remove(self, view):
+        if view in self.views:
+            self.views.remove(view)
+
+    # -- simulation timer --
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        for after_id in (self._after_id, self._render_id):
+            if after_id is not None:
+                self.root.after_cancel(after_id)
+        self._after_id = self._render_id = None
+
+    def _tick(self):
+        started = time.perf_counter()
+        try:
+            self.market.step()
+            for view in list(self.views):
+                if view.on_tick is not None:
+                    view.on_tick(self.market)
+                view.dirty = True
+            self.request_render()
+        finally:
+            # A failing listener is reported by Tk but must not stop the market for every window
+            if self._after_id is not None:  # None: stop() was called meanwhile
+                elapsed_ms = int((time.perf_counter() - started) * 1000)
+                self._after_id = self.root.after(max(1, self.interval_ms - elapsed_ms), self._tick)
+
+    # -- rendering --
+    def request_render(self, delay_ms=0):
+        """Queue a render pass unless one is already queued (pending ticks coalesce into it)."""
+        if self._render_id is None:
+            self._render_id = self.root.after(delay_ms, self.render)
+
+    def render(self):
+        """Redraw the dirty, viewable charts that are due; come back for the ones that aren't yet."""
+        self._render_id = None
+        now = time.perf_counter()
+        next_due = None
+        for view in list(self.views):
+            if not view.dirty or not view.visible():
+                continue
+            if view.next_due > now:
+                next_due = view.next_due if next_due is None else min(next_due, view.next_due)
+                continue
+            started = time.perf_counter()
+            view.redraw()
+            view._drawn(started, time.perf_counter())
+        if next_due is not None:
+            self.request_render(max(1, int((next_due - time.perf_counter()) * 1000)))
@@ -0,0 +1,213 @@
+"""
+export.py
+
+Streaming export of accounts, holdings and registrations to CSV or Parquet.
+
+    accounts       - one row per account with the admin dashboard's columns:
+                     balance, bonus, created, shares and value per sector,
+                     total portfolio value
+    holdings       - one row per non-zero position (email, symbol, sector,
+                     qty, price, value)
+    registrations  - one row per signup in the registrations journal/table
+
+Rows are produced and written CHUNK_ROWS at a time (one CSV flush or one
+Parquet row group per chunk), so the export never builds the whole table
+in memory.  Parquet needs pyarrow.
+
+    python export.py all --format csv --out exports/
+    python export.py accounts --format parquet --out exports/ --backend sqlite
+
+The admin dashboard runs the same export_all() on a worker thread.
+"""
+
+import os
+import csv
+import json
+import argparse
+import itertools
+
+import accounts
+import holdings
+import instruments
+import market
+import valuation
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CHUNK_ROWS = 10000
+FORMATS = ("csv", "parquet")
+KINDS = ("accounts", "holdings", "registrations")
+
+SECTOR_KEYS = valuation.SECTOR_KEYS
+# (column, Parquet type name) per export
+COLUMNS = {
+    "accounts": [("email", "string"), ("name", "string"), ("balance", "float64"), ("bonus", "float64"),
+                 ("created", "string")]
+                + [(f"{key}_shares", "int64") for key in SECTOR_KEYS]
+                + [(f"{key}_value", "float64") for key in SECTOR_KEYS]
+                + [("total_portfolio", "float64")],
+    "holdings": [("email", "string"), ("symbol", "string"), ("sector", "string"), ("qty", "int64"),
+                 ("price", "float64"), ("value", "float64")],
+    "registrations": [("email", "string"), ("name", "string"), ("bonus", "float64"), ("payload", "string")],
+}
+
+
+def snapshot(prices=None):
+    """One fixed set of prices to value an export at (default: the live market's)."""
+    return dict(market.get_market().prices if prices is None else prices)
+
+
+# ----------------------------
+# Row sources (each yields lists of row tuples, CHUNK_ROWS at a time)
+# ----------------------------
+def _account_chunks(repo, chunk):
+    users = repo.all()
+    # Emails are snapshotted so signups during a background export can't break the walk
+    emails = list(users)
+    for start in range(0, len(emails), chunk):
+        batch = {}
+        for email in emails[start:start + chunk]:
+            user = users.get(email)
+            if user is not None:
+                batch[email] = user
+        yield batch
+
+
+def account_rows(repo, prices=None, chunk=CHUNK_ROWS):
+    prices = snapshot(prices)
+    for batch in _account_chunks(repo, chunk):
+        book = valuation.PortfolioMatrix(batch)
+        rows = []
+        for email, counts, values, total in book.rows(prices):
+            user = batch[email]
+            rows.append((email, user.get("name"), user.get("balance"), user.get("bonus"), user.get("created"),
+                         *counts, *values, total))
+        yield rows
+
+
+def holding_rows(repo, prices=None, chunk=CHUNK_ROWS):
+    prices = snapshot(prices)
+    rows = []
+    for batch in _account_chunks(repo, chunk):
+        for email, user in batch.items():
+            for symbol, qty in holdings.decode_account(user)["holdings"].items():
+                inst = instruments.lookup(symbol)
+                price = prices.get(symbol, 0)
+                rows.append((email, symbol, inst.sector if inst else None, qty, price, qty * price))
+            if len(rows) >= chunk:
+                yield rows
+                rows = []
+    if rows:
+        yield rows
+
+
+def registration_rows(repo, prices=None, chunk=CHUNK_ROWS):
+    entries = repo.backend.iter_registrations()
+    while True:
+        batch = list(itertools.islice(entries, chunk))
+        if not batch:
+            return
+        yield [(e.get("email"), e.get("name"), e.get("bonus"), json.dumps(e, ensure_ascii=False)) for e in batch]
+
+
+SOURCES = {"accounts": account_rows, "holdings": holding_rows, "registrations": registration_rows}
+
+
+# ----------------------------
+# Sinks
+# ----------------------------
+class CsvSink:
+    def __init__(self, path, columns):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    def __init__(self, path, columns):
+        self.names = [name for name, _ in columns]
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in columns])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        arrays = [list(column) for column in zip(*rows)]
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(arrays, self.schema)], schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def _sink(fmt, path, columns):
+    if fmt == "csv":
+        return CsvSink(path, columns)
+    if fmt == "parquet":
+        if pa is None:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+        return ParquetSink(path, columns)
+    raise ValueError(f"Unknown export format: {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+# ----------------------------
+# Export
+# ----------------------------
+def export(kind, path, fmt="csv", repo=None, prices=None, chunk=CHUNK_ROWS, progress=None):
+    """Stream one table to path; returns the number of rows written.
+
+    progress(kind, rows_so_far) is called after every chunk.
+    """
+    if kind not in SOURCES:
+        raise ValueError(f"Unknown export: {kind!r} (expected one of {', '.join(KINDS)})")
+    repo = repo or accounts.get_repository()
+    prices = snapshot(prices)  # one consistent set of prices for the whole file
+    sink = _sink(fmt, path, COLUMNS[kind])
+    written = 0
+    try:
+        for rows in SOURCES[kind](repo, prices, chunk):
+            if rows:
+                sink.write(rows)
+                written += len(rows)
+                if progress:
+                    progress(kind, written)
+    finally:
+        sink.close()
+    return written
+
+
+def export_all(out_dir, fmt="csv", repo=None, prices=None, chunk=CHUNK_ROWS, progress=None, kinds=KINDS):
+    """Export each table to out_dir/<kind>.<fmt>; returns {kind: rows written}."""
+    os.makedirs(out_dir, exist_ok=True)
+    prices = snapshot(prices)  # the same prices in every file
+    return {kind: export(kind, os.path.join(out_dir, f"{kind}.{fmt}"), fmt, repo, prices, chunk, progress)
+            for kind in kinds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("what", choices=KINDS + ("all",))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--out", default="exports")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--backend", default=None, help="json, sqlite or sharded (default: INVESTKARO_STORAGE)")
+    args = parser.parse_args()
+
+    repo = accounts.get_repository(kind=args.backend)
+    kinds = KINDS if args.what == "all" else (args.what,)
+    counts = export_all(args.out, args.format, repo, chunk=args.chunk, kinds=kinds)
+    for kind, n in counts.items():
+        print(f"{kind}: {n} rows -> {os.path.join(args.out, f'{kind}.{args.format}')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,101 +1,52 @@
 import os
-import json
 import webbrowser
 import tkinter as tk
-from tkinter import simpledialog, messagebox, ttk
-from PIL import Image, ImageTk
+from tkinter import simpledialog, messagebox, ttk, filedialog
 import datetime
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import mplfinance as mpf
-import pandas as pd
+import queue
+import threading
+import account_index
+import accounts
+import chart_scheduler
+import holdings
+import instruments
+import market
+import trading_engine
+import valuation
 
 # Constants
 DB_FILE = "users.json"
 REG_FILE = "registrations.json"
 ADMIN_PASSWORD = "admin123"
-
-AUTO_COMPANIES = {
-    "Honda": "https://www.screener.in/company/522064/",
-    "Hyundai": "https://www.screener.in/company/540005/",
-    "Tata Motors": "https://www.screener.in/company/TATAMOTORS/",
-    "Mahindra & Mahindra": "https://www.screener.in/company/M%26M/",
-    "Maruti Suzuki": "https://www.screener.in/company/MARUTI/",
-    "Ashok Leyland": "https://www.screener.in/company/ASHOKLEY/"
-}
-PETROLEUM_COMPANIES = {
-    "Reliance Industries": "https://www.screener.in/company/RELIANCE/consolidated/",
-    "Indian Oil Corporation": "https://www.screener.in/company/IOC/",
-    "Bharat Petroleum": "https://www.screener.in/company/BPCL/",
-    "Hindustan Petroleum": "https://www.screener.in/company/HINDPETRO/",
-    "Oil India": "https://www.screener.in/company/OIL/"
-}
-STEEL_COMPANIES = {
-    "Tata Steel": "https://www.screener.in/company/TATASTEEL/",
-    "JSW Steel": "https://www.screener.in/company/JSWSTEEL/",
-    "Steel Authority of India (SAIL)": "https://www.screener.in/company/SAIL/",
-    "Jindal Steel & Power": "https://www.screener.in/company/JINDALSTEL/",
-    "NMDC Steel": "https://www.screener.in/company/NMDCSTEEL/"
-}
-GOLD_COMPANIES = {
-    "Titan": "https://www.screener.in/company/TITAN/",
-    "Muthoot Finance": "https://www.screener.in/company/MUTHOOTFIN/",
-    "Manappuram Finance": "https://www.screener.in/company/MANAPPURAM/",
-    "Rajesh Exports": "https://www.screener.in/company/RAJESHEXPO/",
-    "PC Jeweller": "https://www.screener.in/company/PCJEWELLER/"
-}
-
-PRICES = {
-    **{c: 10 for c in AUTO_COMPANIES},
-    **{c: 15 for c in PETROLEUM_COMPANIES},
-    **{c: 20 for c in STEEL_COMPANIES},
-    **{c: 30 for c in GOLD_COMPANIES}
-}
+ADMIN_PAGE_SIZE = 100
 
 CHART_PRICE_START = 100.0
 CHART_MAX_POINTS = 200
-CHART_STEP_STD = 0.5
 CHART_UPDATE_INTERVAL = 800
 
 
-# JSON Data helpers
-def safe_json_load(path, default):
-    if not os.path.exists(path):
-        return default
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            c = f.read().strip()
-            return json.loads(c) if c else default
-    except Exception:
-        return default
-
+# Market: every symbol moves together; PRICES is the live price mapping used for trades and valuation
+MARKET = market.get_market()
+PRICES = MARKET.prices
 
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+# Storage helpers
+ACCOUNTS = accounts.get_repository(db_file=DB_FILE, reg_file=REG_FILE)
+STORAGE = ACCOUNTS.backend
 
 
 def load_users():
-    return safe_json_load(DB_FILE, {})
+    return ACCOUNTS.all()
 
 
-def save_users(users):
-    save_json(DB_FILE, users)
+ENGINE = trading_engine.TradingEngine(ACCOUNTS, PRICES, instruments.BUCKETS)
 
 
 def load_registrations():
-    return safe_json_load(REG_FILE, [])
+    return STORAGE.load_registrations()
 
 
 def save_registration(entry):
-    regs = load_registrations()
-    regs.append(entry)
-    save_json(REG_FILE, regs)
-
-
-def get_default_shares(companies):
-    return {c: 0 for c in companies}
+    STORAGE.save_registration(entry)
 
 
 def open_link(url):
@@ -106,6 +57,7 @@ def load_image(path, size=None):
     try:
         if not os.path.exists(path):
             return None
+        from PIL import Image, ImageTk
         img = Image.open(path)
         if size:
             img = img.resize(size, Image.LANCZOS)
@@ -136,23 +88,21 @@ class AuthManager:
         if not validate_password(password):
             messagebox.showerror("Error", "Password must be at least 6 characters!")
             return False
-        users = load_users()
-        if email in users:
+        if email in ACCOUNTS:
             messagebox.showerror("Error", "Email already registered! Please login.")
             return False
-        users[email] = {
+        account = {
             "name": name,
             "password": password,
             "balance": 100,
-            "shares": get_default_shares(AUTO_COMPANIES),
-            "petroleum_shares": get_default_shares(PETROLEUM_COMPANIES),
-            "steel_shares": get_default_shares(STEEL_COMPANIES),
-            "gold_shares": get_default_shares(GOLD_COMPANIES),
+            "holdings": holdings.Holdings(),
             "last_buy_price": {},
             "bonus": 100,
             "created": str(datetime.datetime.now())
         }
-        save_users(users)
+        if not ENGINE.signup(email, account):
+            messagebox.showerror("Error", "Email already registered! Please login.")
+            return False
         save_registration({"name": name, "email": email, "bonus": 100})
         messagebox.showinfo("Success", f"Welcome {name}! Signup successful with ₹100 bonus.")
         return True
@@ -165,7 +115,7 @@ class AuthManager:
         if users[email]["password"] != password:
             messagebox.showerror("Error", "Incorrect password!")
             return None
-        messagebox.showinfo("Welcome", f"Welcome back {users[email]['name']}! Balance: ₹{users[email]['balance']}")
+        messagebox.showinfo("Welcome", f"Welcome back {users[email]['name']}! Balance: ₹{users[email]['balance']:.2f}")
         return email
 
 
@@ -184,15 +134,7 @@ def open_dummy_candlestick_chart(user_email, company, entry_price, side="BUY", t
     if invested_amount is None:
         return
 
-    shares_owned = 0
-    if company in AUTO_COMPANIES:
-        shares_owned = user_data.get("shares", {}).get(company, 0)
-    elif company in PETROLEUM_COMPANIES:
-        shares_owned = user_data.get("petroleum_shares", {}).get(company, 0)
-    elif company in STEEL_COMPANIES:
-        shares_owned = user_data.get("steel_shares", {}).get(company, 0)
-    elif company in GOLD_COMPANIES:
-        shares_owned = user_data.get("gold_shares", {}).get(company, 0)
+    shares_owned = instruments.shares_owned(user_data, company)
 
     if shares_owned == 0:
         messagebox.showinfo("No Shares", "You do not own any shares of this company.")
@@ -200,90 +142,90 @@ def open_dummy_candlestick_chart(user_email, company, entry_price, side="BUY", t
 
     effective_entry_price = invested_amount / shares_owned if shares_owned > 0 else ENTRY_PRICE
 
-    ohlc_data = []
-    last_close = effective_entry_price
-
     chart_win = tk.Toplevel()
     chart_win.title(title)
     chart_win.geometry("950x600")
     chart_win.configure(bg="black")
 
-    fig = None
-    ax = None
-    canvas = None
+    # Matplotlib loads with the first chart, not at startup (see benchmarks/bench_startup.py)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import candles
+
+    # Artists are created once; each tick only updates the newest candle (see candles.py)
+    fig = Figure(figsize=(9.5, 5), facecolor="black")
+    ax = fig.add_subplot()
+    ax.set_facecolor("black")
+    ax.tick_params(colors="white")
+    for spine in ax.spines.values():
+        spine.set_color("gray")
+    ax.axhline(effective_entry_price, color="yellow", linestyle="--", linewidth=1.2)
+    canvas = FigureCanvasTkAgg(fig, master=chart_win)
+    chart = candles.CandlestickRenderer(fig, ax, CHART_MAX_POINTS)
+
+    chart.extend(MARKET.history(company)[:, :4])
+
+    # A manual price is a what-if for this chart only: later candles are drawn shifted
+    # by it, while trades and withdrawals keep settling at the market price
+    offset = [0.0]
+
+    def shown(price):
+        return max(price + offset[0], 0.01)
 
     def redraw_chart():
-        nonlocal fig, ax, canvas
-        if len(ohlc_data) == 0:
-            return
-        df = pd.DataFrame(ohlc_data, columns=["Open", "High", "Low", "Close"])
-        df.index = pd.date_range(start="2024-01-01", periods=len(ohlc_data), freq='min')
-        if fig is None or ax is None:
-            fig, axlist = mpf.plot(df, type='candle', style='charles', volume=False, returnfig=True)
-            ax = axlist[0]
-            if canvas is not None:
-                canvas.get_tk_widget().destroy()
-            canvas = FigureCanvasTkAgg(fig, master=chart_win)
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        else:
-            ax.clear()
-            mpf.plot(df, ax=ax, type='candle', style='charles', volume=False, warn_too_much_data=10000)
-        current_price = df.iloc[-1]['Close']
+        market_price = MARKET.price(company)
+        current_price = shown(market_price)
         abs_pl = (current_price - effective_entry_price) * shares_owned if SIDE == "BUY" else (effective_entry_price - current_price) * shares_owned
         pct = (abs_pl / invested_amount) * 100 if invested_amount > 0 else 0
-        ax.set_facecolor("black")
-        ax.set_title(f"{title} | Current: ₹{current_price:.2f} | P/L: ₹{abs_pl:.2f} ({pct:.2f}%)", color='white')
-        ax.axhline(effective_entry_price, color="yellow", linestyle="--", linewidth=1.2)
-        canvas.draw_idle()
-
-    def simulate_next_ohlc(last_close_val):
-        o = last_close_val
-        c = max(0.1, o + np.random.normal(0, CHART_STEP_STD))
-        h = max(o, c) + abs(np.random.normal(0, CHART_STEP_STD * 0.7))
-        l = min(o, c) - abs(np.random.normal(0, CHART_STEP_STD * 0.7))
-        l = max(l, 0.01)
-        return [o, h, l, c]
-
-    def update_chart(_=None):
-        nonlocal last_close
-        candle = simulate_next_ohlc(last_close)
-        ohlc_data.append(candle)
-        last_close = candle[3]
-        if len(ohlc_data) > CHART_MAX_POINTS:
-            ohlc_data.pop(0)
-        redraw_chart()
+        manual = f" (manual; market ₹{market_price:.2f})" if offset[0] else ""
+        chart.set_status(f"{title} | Current: ₹{current_price:.2f}{manual} | P/L: ₹{abs_pl:.2f} ({pct:.2f}%)")
+        chart.set_overlay(f"{view.fps:4.1f} fps  {view.draw_ms:3.0f} ms")
+        chart.draw()
+
+    def on_tick(_market):
+        chart.append(*(shown(v) for v in MARKET.last_candle(company)[:4].tolist()))
 
     def submit_manual_price():
-        nonlocal last_close
         try:
             val = float(price_entry.get())
             if val <= 0:
                 messagebox.showerror("Error", "Enter positive price!")
                 return
-            o = last_close
-            c = val
-            h = max(o, c) + abs(np.random.normal(0, CHART_STEP_STD * 0.7))
-            l = min(o, c) - abs(np.random.normal(0, CHART_STEP_STD * 0.7))
-            l = max(l, 0.05)
-            ohlc_data.append([o, h, l, c])
-            if len(ohlc_data) > CHART_MAX_POINTS:
-                ohlc_data.pop(0)
-            last_close = c
-            redraw_chart()
+            # This chart's next candle opens from val; MARKET is left alone
+            offset[0] = val - MARKET.price(company)
+            view.invalidate()
+            SCHEDULER.request_render()
             price_entry.delete(0, tk.END)
         except Exception:
             messagebox.showerror("Error", "Invalid price")
-            
-
-    stop_flag = [False]
 
-    def animation_loop():
-        if stop_flag[0]:
+    def withdraw_all():
+        latest_price = MARKET.price(company)
+        break_even_price = effective_entry_price
+        if SIDE == "BUY":
+            can_withdraw = latest_price >= break_even_price
+        else:
+            can_withdraw = latest_price <= break_even_price
+        if not can_withdraw:
+            messagebox.showinfo("Info", "Current price not above invested amount, cannot withdraw yet.")
+            return
+        current_total = latest_price * shares_owned
+        try:
+            updated = ENGINE.withdraw(user_email, current_total)
+        except (trading_engine.TradeError, trading_engine.ConflictError) as e:
+            messagebox.showerror("Error", str(e))
             return
-        update_chart()
-        chart_win.after(CHART_UPDATE_INTERVAL, animation_loop)
+        messagebox.showinfo("Success", f"₹{current_total:.2f} (Invested + profit) credited to your trading balance.")
+        withdraw_btn.config(state="disabled")
+        if balance_update_callback:
+            balance_update_callback(updated["balance"])
 
-    chart_win.protocol("WM_DELETE_WINDOW", lambda: (stop_flag.__setitem__(0, True), chart_win.destroy()))
+    def close_chart():
+        SCHEDULER.remove(view)
+        chart.close()
+        chart_win.destroy()
+
+    chart_win.protocol("WM_DELETE_WINDOW", close_chart)
 
     control_frame = tk.Frame(chart_win, bg="black")
     control_frame.pack(fill=tk.X, pady=8)
@@ -293,12 +235,15 @@ def open_dummy_candlestick_chart(user_email, company, entry_price, side="BUY", t
     price_entry.pack(side=tk.LEFT, padx=6)
     tk.Button(control_frame, text="Submit", font=("Arial", 11, "bold"), bg="white", fg="black", command=submit_manual_price).pack(side=tk.LEFT, padx=6)
 
-    withdraw_btn = tk.Button(control_frame, text="Withdraw Profit", font=("Arial", 11, "bold"), bg="green", fg="white", command=withdraw_all())
+    withdraw_btn = tk.Button(control_frame, text="Withdraw Profit", font=("Arial", 11, "bold"), bg="green", fg="white", command=withdraw_all)
     withdraw_btn.pack(side=tk.LEFT, padx=6)
 
-    tk.Button(control_frame, text="Close Chart", font=("Arial", 11, "bold"), bg="red", fg="white", command=lambda: (stop_flag.__setitem__(0, True), chart_win.destroy())).pack(side=tk.RIGHT, padx=8)
+    tk.Button(control_frame, text="Close Chart", font=("Arial", 11, "bold"), bg="red", fg="white", command=close_chart).pack(side=tk.RIGHT, padx=8)
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-    animation_loop()
+    # The shared scheduler appends each tick's candle; redraws are paced per window and paused while it is hidden
+    view = SCHEDULER.add(chart_win, redraw_chart, on_tick=on_tick)
+    SCHEDULER.request_render()
 
 # Trading window
 def buy_sell_window(user_email):
@@ -313,12 +258,12 @@ def buy_sell_window(user_email):
     trade_win.geometry("600x600")
     trade_win.configure(bg="white")
 
-    bal_var = tk.StringVar(value=f"Balance: ₹{user_data['balance']}")
+    bal_var = tk.StringVar(value=f"Balance: ₹{user_data['balance']:.2f}")
     tk.Label(trade_win, textvariable=bal_var, font=("Arial", 14, "bold"), bg="white", fg="green").pack(pady=10)
 
     tk.Label(trade_win, text="Select Sector:", font=("Arial", 12, "bold"), bg="white").pack()
     sector_var = tk.StringVar()
-    sector_cb = ttk.Combobox(trade_win, textvariable=sector_var, state="readonly", values=["Automobile", "Petroleum", "Steel", "Gold"], font=("Arial", 11))
+    sector_cb = ttk.Combobox(trade_win, textvariable=sector_var, state="readonly", values=instruments.SECTOR_LABELS, font=("Arial", 11))
     sector_cb.pack(pady=6)
 
     tk.Label(trade_win, text="Select Company:", font=("Arial", 12, "bold"), bg="white").pack()
@@ -330,17 +275,8 @@ def buy_sell_window(user_email):
     tk.Label(trade_win, textvariable=price_var, font=("Arial", 12, "italic"), bg="white", fg="blue").pack()
 
     def update_companies(event):
-        s = sector_var.get()
-        if s == "Automobile":
-            company_cb['values'] = list(AUTO_COMPANIES.keys())
-        elif s == "Petroleum":
-            company_cb['values'] = list(PETROLEUM_COMPANIES.keys())
-        elif s == "Steel":
-            company_cb['values'] = list(STEEL_COMPANIES.keys())
-        elif s == "Gold":
-            company_cb['values'] = list(GOLD_COMPANIES.keys())
-        else:
-            company_cb['values'] = []
+        sector = instruments.SECTORS_BY_LABEL.get(sector_var.get())
+        company_cb['values'] = list(sector.companies) if sector else []
         company_var.set("")
         price_var.set("Price: -")
 
@@ -351,83 +287,56 @@ def buy_sell_window(user_email):
         price_var.set(f"Price: ₹{PRICES.get(c, '-')}" if c else "Price: -")
 
     company_cb.bind("<<ComboboxSelected>>", update_price)
+    MARKET.subscribe(update_price)
+    trade_win.bind("<Destroy>", lambda e: MARKET.unsubscribe(update_price) if e.widget is trade_win else None)
 
     qty_entry = tk.Entry(trade_win, font=("Arial", 12))
     qty_entry.pack(pady=8)
 
-    def commit():
-        save_users(users)
-        bal_var.set(f"Balance: ₹{user_data['balance']}")
+    def commit(updated=None):
+        nonlocal user_data
+        user_data = updated if updated is not None else ACCOUNTS.get(user_email)
+        bal_var.set(f"Balance: ₹{user_data['balance']:.2f}")
 
-    def buy():
+    def read_order():
         c = company_var.get()
         if not c:
             messagebox.showerror("Error", "Select a company.")
-            return
+            return None
         qty = qty_entry.get()
         if not qty.isdigit() or int(qty) <= 0:
             messagebox.showerror("Error", "Enter positive quantity.")
-            return
-        qty = int(qty)
-        price = PRICES.get(c)
-        cost = price * qty
-        if user_data["balance"] < cost:
-            messagebox.showerror("Error", "Insufficient balance.")
-            return
-        user_data["balance"] -= cost
-        sh_dict = None
-        if c in AUTO_COMPANIES:
-            sh_dict = user_data["shares"]
-        elif c in PETROLEUM_COMPANIES:
-            sh_dict = user_data["petroleum_shares"]
-        elif c in STEEL_COMPANIES:
-            sh_dict = user_data["steel_shares"]
-        elif c in GOLD_COMPANIES:
-            if "gold_shares" not in user_data:
-                user_data["gold_shares"] = get_default_shares(GOLD_COMPANIES)
-            sh_dict = user_data["gold_shares"]
-        if sh_dict is not None:
-            sh_dict[c] = sh_dict.get(c, 0) + qty
-        if "last_buy_price" not in user_data:
-            user_data["last_buy_price"] = {}
-        user_data["last_buy_price"][c] = price
-        commit()
-        messagebox.showinfo("Success", f"Bought {qty} shares of {c} for ₹{cost}.")
+            return None
+        return c, int(qty)
+
+    def execute(side, c, qty):
+        """Cash amount the trade moved, or None if it was rejected."""
+        try:
+            updated, amount = ENGINE.execute(user_email, side, c, qty)
+        except (trading_engine.TradeError, trading_engine.ConflictError) as e:
+            messagebox.showerror("Error", str(e))
+            return None
+        commit(updated)
         qty_entry.delete(0, tk.END)
+        return amount
 
-    def sell():
-        c = company_var.get()
-        if not c:
-            messagebox.showerror("Error", "Select a company.")
-            return
-        qty = qty_entry.get()
-        if not qty.isdigit() or int(qty) <= 0:
-            messagebox.showerror("Error", "Enter positive quantity.")
-            return
-        qty = int(qty)
-        sh_dict = None
-        if c in AUTO_COMPANIES:
-            sh_dict = user_data["shares"]
-        elif c in PETROLEUM_COMPANIES:
-            sh_dict = user_data["petroleum_shares"]
-        elif c in STEEL_COMPANIES:
-            sh_dict = user_data["steel_shares"]
-        elif c in GOLD_COMPANIES:
-            sh_dict = user_data.get("gold_shares", {})
-        else:
-            messagebox.showerror("Error", "Invalid company.")
+    def buy():
+        order = read_order()
+        if order is None:
             return
+        c, qty = order
+        cost = execute(trading_engine.BUY, c, qty)
+        if cost is not None:
+            messagebox.showinfo("Success", f"Bought {qty} shares of {c} for ₹{cost:.2f}.")
 
-        if sh_dict.get(c, 0) < qty:
-            messagebox.showerror("Error", "Not enough shares to sell.")
+    def sell():
+        order = read_order()
+        if order is None:
             return
-
-        sh_dict[c] -= qty
-        earnings = PRICES[c] * qty
-        user_data["balance"] += earnings
-        commit()
-        messagebox.showinfo("Success", f"Sold {qty} shares of {c} for ₹{earnings}.")
-        qty_entry.delete(0, tk.END)
+        c, qty = order
+        earnings = execute(trading_engine.SELL, c, qty)
+        if earnings is not None:
+            messagebox.showinfo("Success", f"Sold {qty} shares of {c} for ₹{earnings:.2f}.")
 
     tk.Button(trade_win, text="Buy", font=("Arial", 12, "bold"), bg="green", fg="white", command=buy).pack(pady=5)
     tk.Button(trade_win, text="Sell", font=("Arial", 12, "bold"), bg="red", fg="white", command=sell).pack(pady=5)
@@ -442,20 +351,16 @@ def buy_sell_window(user_email):
 
     portfolio_frame = tk.Frame(trade_win, bg="white")
     portfolio_frame.pack(pady=10)
-    tk.Button(portfolio_frame, text="🚗 Auto Portfolio", font=("Arial", 11), bg="lightblue",
-              command=lambda: show_portfolio_window(user_email, "auto")).grid(row=0, column=0, padx=5)
-    tk.Button(portfolio_frame, text="⛽ Petroleum Portfolio", font=("Arial", 11), bg="orange",
-              command=lambda: show_portfolio_window(user_email, "petroleum")).grid(row=0, column=1, padx=5)
-    tk.Button(portfolio_frame, text="🏭 Steel Portfolio", font=("Arial", 11), bg="gray",
-              command=lambda: show_portfolio_window(user_email, "steel")).grid(row=0, column=2, padx=5)
-    tk.Button(portfolio_frame, text="🥇 Gold Portfolio", font=("Arial", 11), bg="gold",
-              command=lambda: show_portfolio_window(user_email, "gold")).grid(row=0, column=3, padx=5)
+    for col, sector in enumerate(instruments.SECTORS):
+        tk.Button(portfolio_frame, text=sector.button_text, font=("Arial", 11), bg=sector.button_color,
+                  command=lambda key=sector.key: show_portfolio_window(user_email, key)).grid(row=0, column=col, padx=5)
+    col = len(instruments.SECTORS)
     tk.Button(portfolio_frame, text="Refresh Balance", font=("Arial", 11), bg="yellow",
-              command=commit).grid(row=0, column=4, padx=5)
+              command=commit).grid(row=0, column=col, padx=5)
     tk.Button(portfolio_frame, text="Logout", font=("Arial", 11), bg="pink",
-              command=trade_win.destroy).grid(row=0, column=5, padx=5)
+              command=trade_win.destroy).grid(row=0, column=col + 1, padx=5)
     tk.Button(portfolio_frame, text="Exit App", font=("Arial", 11), bg="red",
-              command=trade_win.quit).grid(row=0, column=6, padx=5)
+              command=trade_win.quit).grid(row=0, column=col + 2, padx=5)
 
 
 
@@ -467,32 +372,14 @@ def show_portfolio_window(user_email, sector):
         return
 
     user_data = users[user_email]
-    if sector == "auto":
-        portfolio_data = user_data.get("shares", {})
-        company_links = AUTO_COMPANIES
-        title = "🚗 Automobile Portfolio"
-        bg_color = "steelblue"
-        sector_img_path = "sectors/auto.png"
-    elif sector == "petroleum":
-        portfolio_data = user_data.get("petroleum_shares", {})
-        company_links = PETROLEUM_COMPANIES
-        title = "⛽ Petroleum Portfolio"
-        bg_color = "orange"
-        sector_img_path = "sectors/petro.png"
-    elif sector == "steel":
-        portfolio_data = user_data.get("steel_shares", {})
-        company_links = STEEL_COMPANIES
-        title = "🏭 Steel Portfolio"
-        bg_color = "lightgray"
-        sector_img_path = "sectors/steel1.png"
-    elif sector == "gold":
-        portfolio_data = user_data.get("gold_shares", {})
-        company_links = GOLD_COMPANIES
-        title = "🥇 Gold Portfolio"
-        bg_color = "gold"
-        sector_img_path = "sectors/gold.png"
-    else:
+    sector_info = instruments.SECTORS_BY_KEY.get(sector)
+    if sector_info is None:
         return
+    portfolio_data = user_data["holdings"].sector(sector_info.key)
+    company_links = sector_info.companies
+    title = sector_info.title
+    bg_color = sector_info.color
+    sector_img_path = sector_info.image
 
     portfolio_win = tk.Toplevel()
     portfolio_win.title(f"{user_data['name']}'s {title}")
@@ -566,53 +453,142 @@ def show_admin_dashboard():
 
     tk.Label(admin_dash, text="📊 Admin Dashboard - User Records", font=("Arial", 16, "bold"), bg="red", fg="white").pack(fill="x", pady=5)
 
-    canvas = tk.Canvas(admin_dash, bg="white")
-    scrollbar = ttk.Scrollbar(admin_dash, orient="vertical", command=canvas.yview)
-    scrollable_frame = tk.Frame(canvas, bg="white")
+    # Only the current page is materialized, so opening costs the same for 10 or 1M users
+    headers = ["Name", "Email", "Balance"] + [f"{sector.label} Stocks" for sector in instruments.SECTORS] + ["Total Portfolio"]
+    table_frame = tk.Frame(admin_dash, bg="white")
+    tree = ttk.Treeview(table_frame, columns=headers, show="headings", height=ADMIN_PAGE_SIZE)
+    for header in headers:
+        tree.heading(header, text=header)
+        tree.column(header, width=120, anchor="center")
+    scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+
+    index = account_index.for_repository(ACCOUNTS)
+    # Paging values at a price snapshot the index re-takes every REPRICE_SECONDS, not every tick
+    prices = index.priced(PRICES)
+    label_to_key = {account_index.SORT_LABELS[key]: key for key in account_index.SORT_KEYS}
+
+    controls = tk.Frame(admin_dash, bg="white")
+    tk.Label(controls, text="Sort by:", font=("Arial", 10), bg="white").pack(side="left", padx=4)
+    sort_var = tk.StringVar(value=account_index.SORT_LABELS["portfolio"])
+    sort_box = ttk.Combobox(controls, textvariable=sort_var, values=list(label_to_key), state="readonly", width=18)
+    sort_box.pack(side="left", padx=4)
+    desc_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(controls, text="Highest first", variable=desc_var, bg="white", command=lambda: show_page(0)).pack(side="left", padx=4)
+    tk.Label(controls, text="Find (email/name):", font=("Arial", 10), bg="white").pack(side="left", padx=(20, 4))
+    filter_entry = tk.Entry(controls, font=("Arial", 10), width=25)
+    filter_entry.pack(side="left", padx=4)
+    tk.Button(controls, text="Search", command=lambda: show_page(0)).pack(side="left", padx=4)
+    sort_box.bind("<<ComboboxSelected>>", lambda e: show_page(0))
+    filter_entry.bind("<Return>", lambda e: show_page(0))
+    controls.pack(fill="x", pady=5)
+
+    page = [0]
+    page_var = tk.StringVar()
+    has_more = [False]
+
+    def show_page(n):
+        nonlocal users, prices
+        users = load_users()
+        prices = index.priced(PRICES)
+        text = filter_entry.get()
+        if not text:
+            n = min(n, max(0, -(-len(users) // ADMIN_PAGE_SIZE) - 1))
+        page[0] = max(n, 0)
+        rows, has_more[0] = index.query(label_to_key[sort_var.get()], prices, descending=desc_var.get(),
+                                        text=text, offset=page[0] * ADMIN_PAGE_SIZE, limit=ADMIN_PAGE_SIZE)
+        book = valuation.PortfolioMatrix({email: users[email] for email, _ in rows})
+        tree.delete(*tree.get_children())
+        for email, counts, values, total_portfolio in book.rows(prices):
+            user = users[email]
+            data = [user.get("name", ""), email, f"₹{user.get('balance', 0):.2f}"]
+            data.extend(f"{count} (₹{value:.2f})" for count, value in zip(counts, values))
+            data.append(f"₹{total_portfolio:.2f}")
+            tree.insert("", "end", values=data)
+        if text:
+            page_var.set(f"Page {page[0] + 1} of matches for {text!r}")
+        else:
+            page_var.set(f"Page {page[0] + 1} of {max(1, -(-len(users) // ADMIN_PAGE_SIZE))} ({len(users)} users)")
 
-    scrollable_frame.bind(
-        "<Configure>",
-        lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-    )
-    canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-    canvas.configure(yscrollcommand=scrollbar.set)
+    def next_page():
+        if has_more[0]:
+            show_page(page[0] + 1)
 
-    headers = ["Name", "Email", "Balance", "Auto Stocks", "Petro Stocks", "Steel Stocks", "Gold Stocks", "Total Portfolio"]
-    for i, header in enumerate(headers):
-        tk.Label(scrollable_frame, text=header, font=("Arial", 11, "bold"), width=15, bg="lightgray", relief="ridge").grid(row=0, column=i, padx=1, pady=1)
-
-    for row, (email, user) in enumerate(users.items(), start=1):
-        auto_total = sum(user.get("shares", {}).values())
-        petro_total = sum(user.get("petroleum_shares", {}).values())
-        steel_total = sum(user.get("steel_shares", {}).values())
-        gold_total = sum(user.get("gold_shares", {}).values())
-
-        auto_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("shares", {}).items())
-        petro_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("petroleum_shares", {}).items())
-        steel_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("steel_shares", {}).items())
-        gold_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("gold_shares", {}).items())
-        total_portfolio = auto_value + petro_value + steel_value + gold_value
-
-        data = [
-            user.get("name", ""),
-            email,
-            f"₹{user.get('balance', 0)}",
-            f"{auto_total} (₹{auto_value})",
-            f"{petro_total} (₹{petro_value})",
-            f"{steel_total} (₹{steel_value})",
-            f"{gold_total} (₹{gold_value})",
-            f"₹{total_portfolio}"
-        ]
-
-        for col, value in enumerate(data):
-            tk.Label(scrollable_frame, text=str(value), font=("Arial", 10), width=15, bg="white", relief="ridge").grid(row=row, column=col, padx=1, pady=1)
-
-    canvas.pack(side="left", fill="both", expand=True)
+    nav = tk.Frame(admin_dash, bg="white")
+    tk.Button(nav, text="⏮ Top", command=lambda: show_page(0)).pack(side="left", padx=4)
+    tk.Button(nav, text="◀ Prev", command=lambda: show_page(page[0] - 1)).pack(side="left", padx=4)
+    tk.Label(nav, textvariable=page_var, font=("Arial", 10), bg="white").pack(side="left", padx=10)
+    tk.Button(nav, text="Next ▶", command=next_page).pack(side="left", padx=4)
+
+    export_var = tk.StringVar()
+    export_events = queue.Queue()
+
+    def start_export(fmt):
+        out_dir = filedialog.askdirectory(parent=admin_dash, title=f"Export {fmt.upper()} to folder")
+        if not out_dir:
+            return
+        import export  # pulls in pyarrow; only the admin export needs it
+
+        # Runs off the UI thread; it only talks to Tk through export_events
+        def worker():
+            try:
+                counts = export.export_all(out_dir, fmt, ACCOUNTS, prices,
+                                           progress=lambda kind, n: export_events.put(("progress", kind, n)))
+                export_events.put(("done", counts, None))
+            except Exception as e:
+                export_events.put(("error", str(e), None))
+
+        for button in export_buttons:
+            button.config(state="disabled")
+        export_var.set("Exporting…")
+        threading.Thread(target=worker, name="admin-export", daemon=True).start()
+        admin_dash.after(200, poll_export)
+
+    def poll_export():
+        finished = False
+        while not export_events.empty():
+            event, a, b = export_events.get_nowait()
+            if event == "progress":
+                export_var.set(f"Exporting {a}: {b} rows…")
+            else:
+                finished = True
+                if event == "done":
+                    export_var.set("Exported " + ", ".join(f"{n} {kind}" for kind, n in a.items()))
+                else:
+                    export_var.set("")
+                    messagebox.showerror("Export failed", a, parent=admin_dash)
+        if finished:
+            for button in export_buttons:
+                button.config(state="normal")
+        elif admin_dash.winfo_exists():
+            admin_dash.after(200, poll_export)
+
+    export_buttons = [
+        tk.Button(nav, text="⬇ Export CSV", command=lambda: start_export("csv")),
+        tk.Button(nav, text="⬇ Export Parquet", command=lambda: start_export("parquet")),
+    ]
+    for button in export_buttons:
+        button.pack(side="right", padx=4)
+    tk.Label(nav, textvariable=export_var, font=("Arial", 9), bg="white", fg="gray").pack(side="right", padx=10)
+
+    totals = ENGINE.totals.estimate(PRICES)
+    tk.Label(admin_dash, text=f"Users: {totals['num_users']} | Cash: ₹{totals['total_balance']:.2f} | "
+                              f"Holdings: ₹{totals['total_portfolio_value']:.2f} | Total in app: ₹{totals['total_money_in_app']:.2f}",
+             font=("Arial", 10, "bold"), bg="white").pack(side="bottom", fill="x")
+
+    cache = ACCOUNTS.stats()
+    tk.Label(admin_dash, text=f"Account cache: {cache['hits']} hits / {cache['misses']} disk reads, {cache['flushes']} flushes",
+             font=("Arial", 9), bg="white", fg="gray").pack(side="bottom", fill="x")
+
+    nav.pack(side="bottom", fill="x", pady=5)
+    table_frame.pack(fill="both", expand=True)
+    tree.pack(side="left", fill="both", expand=True)
     scrollbar.pack(side="right", fill="y")
+    show_page(0)
 
 # Main GUI Window
 def create_main_window():
-    global root
+    global root, SCHEDULER
     root = tk.Tk()
     root.title("InvestKaro - Stock Market Simulator")
     root.geometry("500x700")
@@ -698,6 +674,10 @@ def create_main_window():
               command=check_admin_password, width=15).pack(pady=20)
     tk.Label(admin_frame, text="⚠️ Admin access required", font=("Arial", 12, "italic"), bg="white", fg="gray").pack()
 
+    # One timer moves the whole market and redraws the chart windows that need it
+    SCHEDULER = chart_scheduler.ChartScheduler(root, MARKET, CHART_UPDATE_INTERVAL)
+    SCHEDULER.start()
+
     return root
 
 
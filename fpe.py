@@ -1,20 +1,12 @@
+import accounts
+import aggregates
+import market
+
+
 def app_point_estimation():
-    users = load_users()
-    num_users = len(users)
-    total_balance = 0
-    total_portfolio_value = 0
-    for email, user in users.items():
-        total_balance += user.get("balance", 0)
-        auto_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("shares", {}).items())
-        petro_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("petroleum_shares", {}).items())
-        steel_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("steel_shares", {}).items())
-        gold_value = sum(shares * PRICES.get(company, 0) for company, shares in user.get("gold_shares", {}).items())
-        total_portfolio_value += auto_value + petro_value + steel_value + gold_value
+    return aggregates.for_repository(accounts.get_repository()).estimate(market.get_market().prices)
+
 
-    total_money = total_balance + total_portfolio_value
-    return {
-        "num_users": num_users,
-        "total_balance": total_balance,
-        "total_portfolio_value": total_portfolio_value,
-        "total_money_in_app": total_money
-    }
+def app_point_reconcile():
+    """Full scan; returns whatever the running totals had drifted by (and corrects it)."""
+    return aggregates.for_repository(accounts.get_repository()).reconcile()
@@ -0,0 +1,140 @@
+"""
+holdings.py
+
+Compact per-account holdings.
+
+    in memory  - Holdings: a dense array('q') indexed by instrument slot
+                 (instruments.PRICE_SLOTS), viewable as a NumPy int64
+                 vector without copying
+    on disk    - {"holdings": {symbol: qty}} with only non-zero positions
+
+Storage backends call decode_account()/encode_account() at the boundary.
+decode_account() also reads the legacy per-sector dicts ("shares",
+"petroleum_shares", ...), which are written back in the new layout on
+the next save.
+"""
+
+from array import array
+
+import instruments
+
+N_SLOTS = len(instruments.PRICE_SLOTS)
+SLOT_OF = {symbol: inst.slot for symbol, inst in instruments.INSTRUMENTS.items()}
+LEGACY_BUCKETS = ("shares", "petroleum_shares", "steel_shares", "gold_shares")
+
+
+class Holdings:
+    __slots__ = ("qty", "other")
+
+    def __init__(self, qty=None, other=None):
+        self.qty = qty if qty is not None else array("q", bytes(8 * N_SLOTS))
+        # Positions in symbols the registry doesn't know (delisted, typos in old data)
+        self.other = other if other is not None else {}
+
+    # -- construction --
+    @classmethod
+    def from_sparse(cls, positions):
+        h = cls()
+        for symbol, qty in positions.items():
+            h[symbol] = qty
+        return h
+
+    @classmethod
+    def from_legacy(cls, account):
+        h = cls()
+        for bucket in set(LEGACY_BUCKETS) | set(instruments.HOLDING_BUCKETS):
+            for symbol, qty in account.get(bucket, {}).items():
+                if qty:
+                    h[symbol] = h.get(symbol) + qty
+        return h
+
+    def to_sparse(self):
+        positions = {instruments.PRICE_SLOTS[i]: q for i, q in enumerate(self.qty) if q}
+        positions.update((s, q) for s, q in self.other.items() if q)
+        return positions
+
+    # -- mapping-style access by symbol --
+    def get(self, symbol, default=0):
+        slot = SLOT_OF.get(symbol)
+        if slot is None:
+            return self.other.get(symbol, default)
+        return self.qty[slot]
+
+    def __getitem__(self, symbol):
+        return self.get(symbol)
+
+    def __setitem__(self, symbol, qty):
+        slot = SLOT_OF.get(symbol)
+        if slot is None:
+            self.other[symbol] = qty
+        else:
+            self.qty[slot] = qty
+
+    def __contains__(self, symbol):
+        return self.get(symbol) != 0
+
+    def items(self):
+        """Non-zero (symbol, qty) pairs."""
+        return self.to_sparse().items()
+
+    def sector(self, key):
+        """{company: qty} for every company in a sector, zeros included (what the portfolio window lists)."""
+        return {c: self.qty[SLOT_OF[c]] for c in instruments.SECTORS_BY_KEY[key].companies}
+
+    def total(self, key=None):
+        if key is None:
+            return sum(self.qty) + sum(self.other.values())
+        return sum(self.qty[SLOT_OF[c]] for c in instruments.SECTORS_BY_KEY[key].companies)
+
+    def as_numpy(self):
+        """Zero-copy int64 view of the dense vector (writes go through to the account)."""
+        import numpy as np
+        return np.frombuffer(self.qty, dtype=np.int64)
+
+    # -- copying / comparison --
+    def copy(self):
+        return Holdings(array("q", self.qty), dict(self.other))
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __eq__(self, other):
+        if not isinstance(other, Holdings):
+            return NotImplemented
+        return self.to_sparse() == other.to_sparse()
+
+    def __repr__(self):
+        return f"Holdings({self.to_sparse()!r})"
+
+
+def decode_account(user):
+    """Stored account dict -> in-memory account with a Holdings vector (in place)."""
+    if user is None:
+        return None
+    h = user.get("holdings")
+    if isinstance(h, Holdings):
+        return user
+    if isinstance(h, dict):
+        user["holdings"] = Holdings.from_sparse(h)
+    else:
+        user["holdings"] = Holdings.from_legacy(user)
+    for bucket in set(LEGACY_BUCKETS) | set(instruments.HOLDING_BUCKETS):
+        user.pop(bucket, None)
+    return user
+
+
+def encode_account(user):
+    """In-memory account -> plain dict for serializing (sparse holdings); doesn't modify user."""
+    h = user.get("holdings")
+    if not isinstance(h, Holdings):
+        return user
+    out = dict(user)
+    out["holdings"] = h.to_sparse()
+    return out
+
+
+def copy_account(user):
+    """One-level copy that also copies nested dicts and the holdings vector."""
+    return {k: (v.copy() if isinstance(v, (dict, Holdings)) else v) for k, v in user.items()}
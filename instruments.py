@@ -0,0 +1,129 @@
+"""
+instruments.py
+
+Single registry of every listed company.  Built once at import into an
+O(1) index:
+
+    symbol -> Instrument(symbol, sector, bucket, slot, url)
+
+where bucket is the sector's legacy holdings dict name ("shares",
+"petroleum_shares", ...), slot is the company's position in PRICE_SLOTS,
+price vectors and holdings vectors (holdings.py), and url is its screener.in page.  Front ends, the trading
+engine and valuation code look companies up here instead of walking
+if/elif chains over the per-sector dicts.
+
+More sectors or instruments can be listed without code changes by putting
+them in instruments.json next to this file (or INVESTKARO_INSTRUMENTS):
+
+    {"pharma": {"label": "Pharma", "bucket": "pharma_shares", "base_price": 25,
+                "companies": {"Sun Pharma": "https://www.screener.in/company/SUNPHARMA/"}}}
+"""
+
+import os
+import json
+from collections import namedtuple
+
+INSTRUMENTS_FILE = os.environ.get(
+    "INVESTKARO_INSTRUMENTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instruments.json"))
+
+AUTO_COMPANIES = {
+    "Honda": "https://www.screener.in/company/522064/",
+    "Hyundai": "https://www.screener.in/company/540005/",
+    "Tata Motors": "https://www.screener.in/company/TATAMOTORS/",
+    "Mahindra & Mahindra": "https://www.screener.in/company/M%26M/",
+    "Maruti Suzuki": "https://www.screener.in/company/MARUTI/",
+    "Ashok Leyland": "https://www.screener.in/company/ASHOKLEY/"
+}
+PETROLEUM_COMPANIES = {
+    "Reliance Industries": "https://www.screener.in/company/RELIANCE/consolidated/",
+    "Indian Oil Corporation": "https://www.screener.in/company/IOC/",
+    "Bharat Petroleum": "https://www.screener.in/company/BPCL/",
+    "Hindustan Petroleum": "https://www.screener.in/company/HINDPETRO/",
+    "Oil India": "https://www.screener.in/company/OIL/"
+}
+STEEL_COMPANIES = {
+    "Tata Steel": "https://www.screener.in/company/TATASTEEL/",
+    "JSW Steel": "https://www.screener.in/company/JSWSTEEL/",
+    "Steel Authority of India (SAIL)": "https://www.screener.in/company/SAIL/",
+    "Jindal Steel & Power": "https://www.screener.in/company/JINDALSTEL/",
+    "NMDC Steel": "https://www.screener.in/company/NMDCSTEEL/"
+}
+GOLD_COMPANIES = {
+    "Titan": "https://www.screener.in/company/TITAN/",
+    "Muthoot Finance": "https://www.screener.in/company/MUTHOOTFIN/",
+    "Manappuram Finance": "https://www.screener.in/company/MANAPPURAM/",
+    "Rajesh Exports": "https://www.screener.in/company/RAJESHEXPO/",
+    "PC Jeweller": "https://www.screener.in/company/PCJEWELLER/"
+}
+
+# key, label, holdings bucket, starting price, companies, portfolio window title/colour/image, button text/colour
+Sector = namedtuple("Sector", ["key", "label", "bucket", "base_price", "companies",
+                               "title", "color", "image", "button_text", "button_color"])
+Instrument = namedtuple("Instrument", ["symbol", "sector", "bucket", "slot", "url"])
+
+SECTORS = [
+    Sector("auto", "Automobile", "shares", 10, AUTO_COMPANIES,
+           "🚗 Automobile Portfolio", "steelblue", "sectors/auto.png", "🚗 Auto Portfolio", "lightblue"),
+    Sector("petroleum", "Petroleum", "petroleum_shares", 15, PETROLEUM_COMPANIES,
+           "⛽ Petroleum Portfolio", "orange", "sectors/petro.png", "⛽ Petroleum Portfolio", "orange"),
+    Sector("steel", "Steel", "steel_shares", 20, STEEL_COMPANIES,
+           "🏭 Steel Portfolio", "lightgray", "sectors/steel1.png", "🏭 Steel Portfolio", "gray"),
+    Sector("gold", "Gold", "gold_shares", 30, GOLD_COMPANIES,
+           "🥇 Gold Portfolio", "gold", "sectors/gold.png", "🥇 Gold Portfolio", "gold"),
+]
+
+
+def _load_extra_sectors(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    extra = []
+    for key, s in spec.items():
+        label = s.get("label", key.title())
+        extra.append(Sector(key, label, s.get("bucket", f"{key}_shares"), s.get("base_price", 10),
+                            dict(s.get("companies", {})), s.get("title", f"{label} Portfolio"),
+                            s.get("color", "white"), s.get("image", f"sectors/{key}.png"),
+                            s.get("button_text", f"{label} Portfolio"), s.get("button_color", "white")))
+    return extra
+
+
+def _build():
+    by_symbol = {}
+    for sector in SECTORS:
+        for symbol, url in sector.companies.items():
+            if symbol in by_symbol:
+                raise ValueError(f"{symbol!r} is listed in both {by_symbol[symbol].sector} and {sector.key}")
+            by_symbol[symbol] = Instrument(symbol, sector.key, sector.bucket, len(by_symbol), url)
+    return by_symbol
+
+
+SECTORS.extend(_load_extra_sectors(INSTRUMENTS_FILE))
+
+INSTRUMENTS = _build()
+SECTORS_BY_KEY = {s.key: s for s in SECTORS}
+SECTORS_BY_LABEL = {s.label: s for s in SECTORS}
+SECTOR_LABELS = [s.label for s in SECTORS]
+HOLDING_BUCKETS = [s.bucket for s in SECTORS]
+# holdings bucket -> companies, the shape TradingEngine takes
+BUCKETS = {s.bucket: s.companies for s in SECTORS}
+# slot -> symbol, the column order of price vectors and holdings matrices
+PRICE_SLOTS = list(INSTRUMENTS)
+
+PRICES = {symbol: SECTORS_BY_KEY[inst.sector].base_price for symbol, inst in INSTRUMENTS.items()}
+
+
+def lookup(symbol):
+    """Instrument for symbol, or None."""
+    return INSTRUMENTS.get(symbol)
+
+
+def shares_owned(account, symbol):
+    position = account.get("holdings")
+    if position is not None:
+        return position.get(symbol, 0)
+    # Account dict that hasn't been through holdings.decode_account()
+    inst = INSTRUMENTS.get(symbol)
+    if inst is None:
+        return 0
+    return account.get(inst.bucket, {}).get(symbol, 0)
@@ -0,0 +1,137 @@
+"""
+market.py
+
+One simulated market for every listed symbol.
+
+step() advances every symbol in instruments.PRICE_SLOTS together, taking
+the next row of candles from a seeded block of pre-generated paths
+(paths.PathFeed) and appending it to a shared ring buffer.  The paths
+come from a price_models model: GBM unless INVESTKARO_PRICE_MODEL says
+otherwise.
+
+    MARKET = market.get_market()
+    PRICES = MARKET.prices            # live symbol -> price mapping for trades/valuation
+    MARKET.subscribe(on_tick)         # on_tick(market) after every step
+    MARKET.step()                     # driven by the app's timer
+    MARKET.history("Honda", 100)      # (n, 5) OHLCV view for a chart
+
+Front ends without a timer (Streamlit) call catch_up(), which applies as
+many steps as have elapsed since the last call.
+"""
+
+import time
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+import instruments
+import paths
+import price_models
+from ohlc_buffer import OHLCBuffer
+
+TICK_SECONDS = 0.8
+HISTORY = 200
+
+
+class LivePrices(Mapping):
+    """Read-only symbol -> latest close (rounded to paise), backed by the market's price vector."""
+
+    def __init__(self, market):
+        self._market = market
+
+    def __getitem__(self, symbol):
+        slot = self._market.slot_of[symbol]
+        return round(float(self._market.closes[slot]), 2)
+
+    def __iter__(self):
+        return iter(self._market.symbols)
+
+    def __len__(self):
+        return len(self._market.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._market.slot_of
+
+
+class Market:
+    def __init__(self, start_prices=None, history=HISTORY, model=None, seed=None):
+        start_prices = start_prices or instruments.PRICES
+        self.symbols = list(instruments.PRICE_SLOTS)
+        self.slot_of = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # A price_models.PriceModel, or its name (walk, gbm, merton, ou, sector)
+        if model is None or isinstance(model, str):
+            model = price_models.get_model(model, symbols=self.symbols)
+        self.model = model
+        self.closes = np.array([float(start_prices.get(s, 0)) for s in self.symbols])
+        self.feed = paths.PathFeed(self.closes, self.model.candles, seed=seed)
+        self.buffer = OHLCBuffer(history, width=len(self.symbols))
+        self.prices = LivePrices(self)
+        self.tick = 0
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._last_step = time.monotonic()
+
+    # -- simulation --
+    def step(self):
+        """Advance every symbol by one candle; returns the (M, 5) row appended."""
+        with self._lock:
+            candles = self.feed.next()
+            self.buffer.extend(candles[None])
+            self.closes = candles[:, paths.CLOSE].copy()
+            self.tick += 1
+            self._last_step = time.monotonic()
+            row = self.buffer.last()
+        for listener in list(self._listeners):
+            listener(self)
+        return row
+
+    def catch_up(self, now=None):
+        """Apply the steps that TICK_SECONDS of wall time since the last one call for."""
+        # due is worked out under the lock too, so two callers can't both apply the same interval
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            due = min(max(int((now - self._last_step) / TICK_SECONDS), 0), self.buffer.capacity)
+            if due:
+                # One block copy instead of due separate steps; listeners hear about it once
+                rows = self.feed.take(due)
+                self.buffer.extend(rows)
+                self.closes = rows[-1][:, paths.CLOSE].copy()
+                self.tick += due
+                self._last_step = now
+        if due:
+            for listener in list(self._listeners):
+                listener(self)
+        return due
+
+    # -- reads --
+    def price(self, symbol):
+        return self.prices[symbol]
+
+    def history(self, symbol, n=None):
+        """Zero-copy (n, 5) OHLCV view of one symbol, oldest first."""
+        return self.buffer.view(n)[:, self.slot_of[symbol]]
+
+    def last_candle(self, symbol):
+        return self.buffer.last()[self.slot_of[symbol]]
+
+    # -- subscribers --
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+
+_MARKET = None
+_MARKET_LOCK = threading.Lock()
+
+
+def get_market():
+    """The process-wide market shared by every window and the trading engine."""
+    global _MARKET
+    with _MARKET_LOCK:
+        if _MARKET is None:
+            _MARKET = Market()
+        return _MARKET
@@ -0,0 +1,88 @@
+"""
+ohlc_buffer.py
+
+Fixed-capacity ring buffer of candles for the live charts.
+
+Rows of (open, high, low, close, volume) live in one preallocated float64
+array.  Every row is written twice, at i and i + capacity, so the last n
+rows are always contiguous and view() returns them as a zero-copy (n, 5)
+NumPy view, oldest first.
+
+    buf = OHLCBuffer(200)
+    buf.append(o, h, l, c)
+    buf.last()[CLOSE]
+    buf.view(50)[:, HIGH].max()
+
+With width=M each row is an (M, 5) block, one candle per symbol (the
+shared market history in market.py).
+"""
+
+import numpy as np
+
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class OHLCBuffer:
+    def __init__(self, capacity, width=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.width = width
+        row_shape = (len(FIELDS),) if width is None else (width, len(FIELDS))
+        self._data = np.zeros((2 * capacity,) + row_shape)
+        self._next = 0    # slot the next row goes into
+        self.count = 0    # rows appended over the buffer's lifetime
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, o, h, l, c, volume=0.0):
+        if self.width is None:
+            self.push((o, h, l, c, volume))
+        else:
+            self.push(np.stack(np.broadcast_arrays(o, h, l, c, volume), axis=-1))
+
+    def push(self, row):
+        """Append one prebuilt row: shape (5,), or (width, 5) for a multi-symbol buffer."""
+        self._data[self._next] = row
+        self._data[self._next + self.capacity] = row
+        self._next = (self._next + 1) % self.capacity
+        self.count += 1
+
+    def extend(self, rows):
+        """Append n rows in one go: (n, 4|5), or (n, width, 4|5) for a multi-symbol buffer."""
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.shape[1:-1] != self._data.shape[1:-1] or rows.shape[-1] not in (4, 5):
+            raise ValueError(f"rows must be shaped (n, {', '.join(map(str, self._data.shape[1:-1] + ('4|5',)))})")
+        if rows.shape[-1] == 4:
+            rows = np.concatenate([rows, np.zeros(rows.shape[:-1] + (1,))], axis=-1)
+        # Only the last `capacity` rows can survive
+        skipped = max(0, len(rows) - self.capacity)
+        rows = rows[skipped:]
+        slots = (self._next + np.arange(len(rows))) % self.capacity
+        self._data[slots] = rows
+        self._data[slots + self.capacity] = rows
+        self._next = (self._next + len(rows)) % self.capacity
+        self.count += skipped + len(rows)
+
+    def view(self, n=None):
+        """Last n rows (default: all held), oldest first, as a read-only view."""
+        held = len(self)
+        n = held if n is None else min(n, held)
+        end = self._next + self.capacity if self.count >= self.capacity else self._next
+        out = self._data[end - n:end]
+        out.flags.writeable = False
+        return out
+
+    def last(self):
+        if not self.count:
+            raise IndexError("empty buffer")
+        return self._data[(self._next - 1) % self.capacity]
+
+    def column(self, field, n=None):
+        return self.view(n)[:, field]
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
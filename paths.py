@@ -0,0 +1,86 @@
+"""
+paths.py
+
+Bulk, seeded price path generation.
+
+simulate_next_ohlc drew three normal samples per candle per call, and the
+Streamlit chart looped 200 times in Python.  generate_candles() builds
+n candles for m symbols in one vectorized call: all shocks are drawn up
+front and closes are their cumulative sum from the start prices.  With the
+same seed the same paths come back, which makes charts and load tests
+reproducible.
+
+    candles = generate_candles([10, 15, 20], n=200, seed=42)   # (200, 3, 4) OHLC
+    closes = candles[:, :, CLOSE]
+
+PathFeed serves live ticks one row at a time out of a pre-generated
+block and refills it (continuing from the last close) when it runs out;
+market.Market uses it.
+"""
+
+import numpy as np
+
+OPEN, HIGH, LOW, CLOSE = range(4)
+STEP_STD = 0.5
+MIN_PRICE = 0.1
+WICK_SCALE = 0.7
+BLOCK = 256
+
+
+def generate_candles(start_prices, n, step_std=STEP_STD, seed=None, rng=None, min_price=MIN_PRICE):
+    """(n, m, 4) OHLC candles for m symbols starting at start_prices (arithmetic random walk).
+
+    Closes are start + cumsum(shocks) floored at min_price; wicks extend past
+    the body by |normal| * WICK_SCALE * step_std.
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    start = np.asarray(start_prices, dtype=np.float64)
+    step_std = np.broadcast_to(np.asarray(step_std, dtype=np.float64), start.shape)
+    shocks = rng.standard_normal((3, n) + start.shape)
+    closes = np.maximum(start + np.cumsum(shocks[0] * step_std, axis=0), min_price)
+    return candles_from_closes(start, closes, shocks[1:], step_std)
+
+
+def candles_from_closes(start, closes, wick_shocks, step_std):
+    """Build OHLC rows around a path of closes: each candle opens at the previous close."""
+    opens = np.concatenate([start[None], closes[:-1]], axis=0)
+    out = np.empty(closes.shape + (4,))
+    out[..., OPEN] = opens
+    out[..., CLOSE] = closes
+    out[..., HIGH] = np.maximum(opens, closes) + np.abs(wick_shocks[0]) * WICK_SCALE * step_std
+    out[..., LOW] = np.maximum(np.minimum(opens, closes) - np.abs(wick_shocks[1]) * WICK_SCALE * step_std, 0.01)
+    return out
+
+
+class PathFeed:
+    """Hands out one (m, 4) candle row per tick from pre-generated blocks.
+
+    generate(start_prices, n, rng) -> (n, m, 4) is the block builder:
+    generate_candles by default, a price_models model's candles in the market.
+    """
+
+    def __init__(self, start_prices, generate=generate_candles, block=BLOCK, seed=None):
+        self.generate = generate
+        self.block = block
+        self.rng = np.random.default_rng(seed)
+        self._last = np.asarray(start_prices, dtype=np.float64)
+        self._rows = None
+        self._pos = 0
+
+    def next(self):
+        if self._rows is None or self._pos == len(self._rows):
+            self._rows = self.generate(self._last, self.block, rng=self.rng)
+            self._pos = 0
+        row = self._rows[self._pos]
+        self._pos += 1
+        self._last = row[:, CLOSE]
+        return row
+
+    def take(self, n):
+        """The next n rows at once, (n, m, 4)."""
+        return np.stack([self.next() for _ in range(n)]) if n else np.empty((0,) + self._last.shape + (4,))
+
+    def reset(self, prices):
+        """Drop the rest of the block and continue from prices (e.g. a manual price override)."""
+        self._last = np.asarray(prices, dtype=np.float64)
+        self._rows = None
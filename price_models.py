@@ -0,0 +1,197 @@
+"""
+price_models.py
+
+Stochastic price models for the market simulator.
+
+Every model generates whole blocks of paths at once - n ticks for m
+symbols with a handful of array operations - and turns them into candles:
+
+    walk      - the original arithmetic random walk (fixed step, floored)
+    gbm       - geometric Brownian motion: log-returns ~ N((mu - sigma^2/2) dt, sigma^2 dt)
+    merton    - GBM plus Poisson jumps with normally distributed log sizes
+    ou        - mean reversion of log price towards a per-symbol level
+                (exact Ornstein-Uhlenbeck discretisation)
+    sector    - GBM whose shocks are correlated through the Cholesky factor
+                of a correlation matrix (by default rho_sector within a
+                sector, rho_market across sectors)
+
+Parameters are per tick (dt=1).  Each one can be a scalar, a sequence in
+instruments.PRICE_SLOTS order, or a dict keyed by symbol or sector key
+with an optional "default":
+
+    GBM(sigma={"gold": 0.004, "Tata Steel": 0.02, "default": 0.01})
+
+market.Market picks its model with INVESTKARO_PRICE_MODEL (default gbm);
+benchmarks/bench_price_models.py times them for large universes.
+"""
+
+import os
+
+import numpy as np
+
+import instruments
+import paths
+
+PRICE_MODEL = os.environ.get("INVESTKARO_PRICE_MODEL", "gbm")
+
+
+def per_symbol(value, symbols, default):
+    """Scalar / sequence / {symbol or sector key: value, "default": value} -> float array, one per symbol."""
+    if isinstance(value, dict):
+        fallback = value.get("default", default)
+        out = []
+        for symbol in symbols:
+            inst = instruments.lookup(symbol)
+            sector = inst.sector if inst else None
+            out.append(value.get(symbol, value.get(sector, fallback)))
+        return np.asarray(out, dtype=np.float64)
+    return np.broadcast_to(np.asarray(default if value is None else value, dtype=np.float64), (len(symbols),)).copy()
+
+
+class PriceModel:
+    name = None
+
+    def __init__(self, symbols=None):
+        self.symbols = list(symbols if symbols is not None else instruments.PRICE_SLOTS)
+
+    def param(self, value, default):
+        return per_symbol(value, self.symbols, default)
+
+    def closes(self, start, n, rng):
+        """(n, m) closes following start."""
+        raise NotImplementedError
+
+    def wick_std(self, closes):
+        """How far wicks reach past the candle body, per candle."""
+        raise NotImplementedError
+
+    def candles(self, start, n, rng=None, seed=None):
+        """(n, m, 4) OHLC candles following start - the block builder for paths.PathFeed."""
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        start = np.asarray(start, dtype=np.float64)
+        closes = self.closes(start, n, rng)
+        wicks = rng.standard_normal((2,) + closes.shape)
+        return paths.candles_from_closes(start, closes, wicks, self.wick_std(closes))
+
+
+class RandomWalk(PriceModel):
+    name = "walk"
+
+    def __init__(self, step_std=None, min_price=paths.MIN_PRICE, symbols=None):
+        super().__init__(symbols)
+        self.step_std = self.param(step_std, paths.STEP_STD)
+        self.min_price = min_price
+
+    def closes(self, start, n, rng):
+        steps = rng.standard_normal((n, len(start))) * self.step_std
+        return np.maximum(start + np.cumsum(steps, axis=0), self.min_price)
+
+    def wick_std(self, closes):
+        return self.step_std
+
+
+class GBM(PriceModel):
+    name = "gbm"
+
+    def __init__(self, mu=None, sigma=None, dt=1.0, symbols=None):
+        super().__init__(symbols)
+        self.mu = self.param(mu, 0.0)
+        self.sigma = self.param(sigma, 0.01)
+        self.dt = dt
+
+    def shocks(self, n, rng):
+        return rng.standard_normal((n, len(self.symbols)))
+
+    def log_returns(self, n, rng):
+        drift = (self.mu - 0.5 * self.sigma ** 2) * self.dt
+        return drift + self.sigma * np.sqrt(self.dt) * self.shocks(n, rng)
+
+    def closes(self, start, n, rng):
+        return start * np.exp(np.cumsum(self.log_returns(n, rng), axis=0))
+
+    def wick_std(self, closes):
+        return closes * self.sigma * np.sqrt(self.dt)
+
+
+class MertonJumpDiffusion(GBM):
+    name = "merton"
+
+    def __init__(self, mu=None, sigma=None, jump_rate=None, jump_mean=None, jump_std=None, dt=1.0, symbols=None):
+        super().__init__(mu, sigma, dt, symbols)
+        self.jump_rate = self.param(jump_rate, 0.01)    # expected jumps per tick
+        self.jump_mean = self.param(jump_mean, -0.02)   # mean log jump size
+        self.jump_std = self.param(jump_std, 0.05)
+
+    def log_returns(self, n, rng):
+        # Compensate the drift so jumps don't change the expected price
+        kappa = np.exp(self.jump_mean + 0.5 * self.jump_std ** 2) - 1
+        diffusion = super().log_returns(n, rng) - self.jump_rate * kappa * self.dt
+        counts = rng.poisson(self.jump_rate * self.dt, size=diffusion.shape)
+        jumps = counts * self.jump_mean + np.sqrt(counts) * self.jump_std * rng.standard_normal(diffusion.shape)
+        return diffusion + jumps
+
+
+class OrnsteinUhlenbeck(PriceModel):
+    name = "ou"
+
+    def __init__(self, theta=None, level=None, sigma=None, dt=1.0, symbols=None):
+        super().__init__(symbols)
+        self.theta = self.param(theta, 0.02)    # mean-reversion speed per tick
+        # Long-run price level; None reverts to wherever the first block starts
+        self.level = None if level is None else self.param(level, 0.0)
+        self.sigma = self.param(sigma, 0.01)
+        self.dt = dt
+
+    def closes(self, start, n, rng):
+        if self.level is None:
+            self.level = start.copy()
+        decay = np.exp(-self.theta * self.dt)
+        noise_std = self.sigma * np.sqrt((1 - decay ** 2) / (2 * self.theta))
+        log_level = np.log(np.maximum(self.level, paths.MIN_PRICE))
+        noise = rng.standard_normal((n, len(start))) * noise_std
+        x = np.log(np.maximum(start, paths.MIN_PRICE))
+        out = np.empty((n, len(start)))
+        # Each tick depends on the previous one; the loop is over ticks, every symbol at once
+        for t in range(n):
+            x = log_level + (x - log_level) * decay + noise[t]
+            out[t] = x
+        return np.exp(out)
+
+    def wick_std(self, closes):
+        return closes * self.sigma * np.sqrt(self.dt)
+
+
+class SectorCorrelatedGBM(GBM):
+    name = "sector"
+
+    def __init__(self, mu=None, sigma=None, rho_sector=0.6, rho_market=0.2, correlation=None, sectors=None,
+                 dt=1.0, symbols=None):
+        super().__init__(mu, sigma, dt, symbols)
+        if correlation is None:
+            if sectors is None:
+                sectors = [getattr(instruments.lookup(s), "sector", s) for s in self.symbols]
+            correlation = sector_correlation(sectors, rho_sector, rho_market)
+        self.correlation = np.asarray(correlation, dtype=np.float64)
+        self.cholesky = np.linalg.cholesky(self.correlation)
+
+    def shocks(self, n, rng):
+        return rng.standard_normal((n, len(self.symbols))) @ self.cholesky.T
+
+
+def sector_correlation(sectors, rho_sector, rho_market):
+    """rho_sector between symbols of the same sector, rho_market otherwise, 1 on the diagonal."""
+    sectors = np.array(sectors, dtype=object)
+    same = sectors[:, None] == sectors[None, :]
+    corr = np.where(same, rho_sector, rho_market).astype(np.float64)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+MODELS = {cls.name: cls for cls in (RandomWalk, GBM, MertonJumpDiffusion, OrnsteinUhlenbeck, SectorCorrelatedGBM)}
+
+
+def get_model(name=None, **params):
+    name = (name or PRICE_MODEL).lower()
+    if name not in MODELS:
+        raise ValueError(f"Unknown price model: {name!r} (expected one of {', '.join(MODELS)})")
+    return MODELS[name](**params)
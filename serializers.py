@@ -0,0 +1,269 @@
+"""
+serializers.py
+
+On-disk formats for the account database.
+
+    pretty   - indented JSON, the original users.json layout (default)
+    compact  - JSON without indentation/whitespace
+    orjson   - compact JSON through orjson, if it's installed
+    msgpack  - MessagePack, if the msgpack package is installed
+    packed   - struct-packed binary: company names go into a string table
+               once and holdings are stored as (company id, qty) int pairs
+
+Choose one with INVESTKARO_SERIALIZER; benchmarks/bench_serializers.py
+compares them.
+"""
+
+import os
+import json
+import struct
+
+import instruments
+
+SERIALIZER = os.environ.get("INVESTKARO_SERIALIZER", "pretty")
+
+# "holdings" is the sparse {symbol: qty} dict written by holdings.encode_account();
+# the per-sector dicts are still understood so old databases convert
+HOLDING_BUCKETS = ("holdings",) + tuple(instruments.HOLDING_BUCKETS)
+ACCOUNT_FIELDS = ("name", "password", "balance", "bonus", "created")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class PrettyJsonSerializer:
+    name = "pretty"
+    extension = ".json"
+
+    def dumps(self, users):
+        return json.dumps(users, indent=4, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class CompactJsonSerializer:
+    name = "compact"
+    extension = ".json"
+
+    def dumps(self, users):
+        return json.dumps(users, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+    extension = ".json"
+
+    def dumps(self, users):
+        return orjson.dumps(users)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+    extension = ".msgpack"
+
+    def dumps(self, users):
+        return msgpack.packb(users, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# ----------------------------
+# Struct-packed format
+# ----------------------------
+# File:     MAGIC, string table, u32 account count, accounts
+# Strings:  u32 byte length (NONE_LEN for None) + utf-8 bytes
+# Numbers:  1-byte tag - b"i" int64, b"f" float64, b"n" None
+# Account:  email, name, password, balance, bonus, created, extra (JSON
+#           string for any other keys), u8 bucket count, then per bucket:
+#           u32 bucket string id, u32 n, n x (u32 company id, i64 qty)
+MAGIC = b"IKDB\x01"
+NONE_LEN = 0xFFFFFFFF
+_U8 = struct.Struct("<B")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_BUCKET_HEADER = struct.Struct("<II")
+
+
+class PackedSerializer:
+    name = "packed"
+    extension = ".ikdb"
+
+    def dumps(self, users):
+        strings = {}
+        body = []
+        add = body.append
+
+        def intern(s):
+            idx = strings.get(s)
+            if idx is None:
+                idx = strings[s] = len(strings)
+            return idx
+
+        def put_str(s):
+            if s is None:
+                add(_U32.pack(NONE_LEN))
+            else:
+                b = s.encode("utf-8")
+                add(_U32.pack(len(b)))
+                add(b)
+
+        def put_num(v):
+            if v is None:
+                add(b"n")
+            elif isinstance(v, int) and not isinstance(v, bool):
+                add(b"i")
+                add(_I64.pack(v))
+            else:
+                add(b"f")
+                add(_F64.pack(float(v)))
+
+        add(_U32.pack(len(users)))
+        for email, user in users.items():
+            extra = {k: v for k, v in user.items() if k not in ACCOUNT_FIELDS and k not in HOLDING_BUCKETS}
+            buckets = []
+            for bucket in HOLDING_BUCKETS:
+                holdings = user.get(bucket)
+                if holdings is None:
+                    continue
+                if all(isinstance(q, int) and not isinstance(q, bool) for q in holdings.values()):
+                    buckets.append((bucket, holdings))
+                else:
+                    # Fractional/odd quantities don't fit the int64 slots; keep them verbatim
+                    extra[bucket] = holdings
+            put_str(email)
+            put_str(user.get("name"))
+            put_str(user.get("password"))
+            put_num(user.get("balance"))
+            put_num(user.get("bonus"))
+            put_str(user.get("created"))
+            put_str(json.dumps(extra, ensure_ascii=False, separators=(",", ":")) if extra else None)
+            add(_U8.pack(len(buckets)))
+            for bucket, holdings in buckets:
+                add(_BUCKET_HEADER.pack(intern(bucket), len(holdings)))
+                flat = []
+                for company, qty in holdings.items():
+                    flat.append(intern(company))
+                    flat.append(qty)
+                add(struct.pack("<" + "Iq" * len(holdings), *flat))
+
+        head = [MAGIC, _U32.pack(len(strings))]
+        for s in strings:
+            b = s.encode("utf-8")
+            head.append(_U32.pack(len(b)))
+            head.append(b)
+        return b"".join(head + body)
+
+    def loads(self, data):
+        # Truncated or corrupt files surface as ValueError, like a JSON parse
+        # error, so storage.safe_load quarantines them instead of starting empty
+        try:
+            return self._loads(memoryview(data))
+        except (struct.error, IndexError, KeyError, TypeError) as e:
+            raise ValueError(f"corrupt packed account database: {e}") from e
+
+    def _loads(self, data):
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a packed account database")
+        pos = len(MAGIC)
+
+        def get_str():
+            nonlocal pos
+            (n,) = _U32.unpack_from(data, pos)
+            pos += 4
+            if n == NONE_LEN:
+                return None
+            s = str(data[pos:pos + n], "utf-8")
+            pos += n
+            return s
+
+        def get_num():
+            nonlocal pos
+            tag = data[pos]
+            pos += 1
+            if tag == 0x69:  # b"i"
+                (v,) = _I64.unpack_from(data, pos)
+                pos += 8
+                return v
+            if tag == 0x66:  # b"f"
+                (v,) = _F64.unpack_from(data, pos)
+                pos += 8
+                return v
+            return None
+
+        (n_strings,) = _U32.unpack_from(data, pos)
+        pos += 4
+        strings = [get_str() for _ in range(n_strings)]
+
+        (n_users,) = _U32.unpack_from(data, pos)
+        pos += 4
+        users = {}
+        for _ in range(n_users):
+            email = get_str()
+            user = {"name": get_str(), "password": get_str(), "balance": get_num()}
+            bonus = get_num()
+            created = get_str()
+            extra = get_str()
+            (n_buckets,) = _U8.unpack_from(data, pos)
+            pos += 1
+            for _ in range(n_buckets):
+                bucket_id, n = _BUCKET_HEADER.unpack_from(data, pos)
+                pos += _BUCKET_HEADER.size
+                flat = struct.unpack_from("<" + "Iq" * n, data, pos)
+                pos += 12 * n
+                user[strings[bucket_id]] = {strings[flat[i]]: flat[i + 1] for i in range(0, 2 * n, 2)}
+            if bonus is not None:
+                user["bonus"] = bonus
+            if created is not None:
+                user["created"] = created
+            if extra is not None:
+                user.update(json.loads(extra))
+            users[email] = user
+        if pos != len(data):
+            raise ValueError(f"{len(data) - pos} bytes of trailing data")
+        return users
+
+
+SERIALIZERS = {
+    "pretty": PrettyJsonSerializer,
+    "compact": CompactJsonSerializer,
+    "orjson": OrjsonSerializer,
+    "msgpack": MsgpackSerializer,
+    "packed": PackedSerializer,
+}
+
+
+def available():
+    names = ["pretty", "compact"]
+    if orjson is not None:
+        names.append("orjson")
+    if msgpack is not None:
+        names.append("msgpack")
+    names.append("packed")
+    return names
+
+
+def get_serializer(name=None):
+    name = (name or SERIALIZER).lower()
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer: {name!r} (expected one of {', '.join(SERIALIZERS)})")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson serializer selected but orjson is not installed (pip install orjson)")
+    if name == "msgpack" and msgpack is None:
+        raise ValueError("msgpack serializer selected but msgpack is not installed (pip install msgpack)")
+    return SERIALIZERS[name]()
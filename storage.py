@@ -0,0 +1,819 @@
+"""
+storage.py
+
+Account storage backends for InvestKaro.
+
+Both front ends (final.py and streamlitstockapp.py) go through a backend
+object instead of reading and rewriting users.json themselves:
+
+    JsonBackend    - the original users.json / registrations.json files,
+                     fine for small installs.
+    SqliteBackend  - one SQLite database (WAL mode) with accounts, holdings
+                     and registrations stored as rows, so a trade only
+                     rewrites the account that changed.
+    ShardedBackend - one file per account under accounts/, each with its
+                     own advisory lock, for several app instances at once.
+
+Pick one with the INVESTKARO_STORAGE environment variable ("json",
+"sqlite" or "sharded").  Existing JSON data can be moved over once with:
+
+    python storage.py migrate            # -> SQLite
+    python storage.py migrate sharded    # -> accounts/
+
+With the JSON backend, signups go to an append-only registrations.jsonl
+journal; fold it (and any old registrations.json) into one file with:
+
+    python storage.py compact
+
+The JSON backend's file format (pretty/compact JSON, orjson, msgpack or a
+struct-packed binary) comes from serializers.py; see INVESTKARO_SERIALIZER.
+
+Every backend hands out accounts with a holdings.Holdings vector under
+"holdings" and stores only the non-zero positions; old per-sector dicts
+are converted when read.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import holdings
+import instruments
+import serializers
+
+# ----------------------------
+# Config
+# ----------------------------
+DB_FILE = "users.json"
+REG_FILE = "registrations.json"
+REG_LOG_FILE = "registrations.jsonl"
+SQLITE_FILE = "investkaro.db"
+SHARD_DIR = "accounts"
+STORAGE_BACKEND = os.environ.get("INVESTKARO_STORAGE", "json")
+
+# Holdings live in their own table in SQLite (and the legacy per-sector dicts are read into it)
+HOLDING_KEYS = ("holdings",) + tuple(holdings.LEGACY_BUCKETS) + tuple(instruments.HOLDING_BUCKETS)
+# Account fields that get their own column in SQLite; anything else goes into "extra"
+ACCOUNT_COLUMNS = ("name", "password", "balance", "bonus", "created", "rev")
+
+# Registration journal tuning
+REG_FSYNC_EVERY = 16        # fsync after this many appends...
+REG_FSYNC_INTERVAL = 1.0    # ...or once this many seconds have passed since the last fsync
+REG_COMPACT_EVERY = 10000   # fold + rewrite the journal after this many appends
+
+
+# ----------------------------
+# JSON helpers
+# ----------------------------
+def safe_load(path, default, loads=json.loads):
+    """Parsed contents of path; default if it is missing or empty.
+
+    Unparseable files are quarantined.  Any other error (permissions, I/O,
+    memory) propagates: returning default would let the next save replace
+    the file with just the accounts written since.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return default
+    # isspace() stops at the first real character, unlike strip() which copies the whole file
+    if not data or data.isspace():
+        return default
+    try:
+        return loads(data)
+    except ValueError:
+        # Don't let the next save silently replace an unreadable file with an
+        # empty one - keep it aside so the accounts can be recovered by hand.
+        quarantine(path)
+        return default
+
+
+def safe_json_load(path, default):
+    return safe_load(path, default)
+
+
+def quarantine(path):
+    aside = f"{path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+    try:
+        os.replace(path, aside)
+    except OSError:
+        return None
+    print(f"[storage] {path} could not be parsed; moved it to {aside}", file=sys.stderr)
+    return aside
+
+
+def atomic_write(path, data):
+    """Write bytes to path so readers see either the old or the new file, never half of one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates 0600 files; keep the permissions the target already had
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on a sidecar lock file (fcntl, or msvcrt on Windows)."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def account_rev(user):
+    """Revision of a stored account; None if it doesn't exist yet."""
+    if user is None:
+        return None
+    return user.get("rev", 0)
+
+
+def decode_users(users):
+    for user in users.values():
+        holdings.decode_account(user)
+    return users
+
+
+def encode_users(users):
+    return {email: holdings.encode_account(user) for email, user in users.items()}
+
+
+# ----------------------------
+# Registration journal
+# ----------------------------
+class RegistrationLog:
+    """Append-only JSON-Lines journal of signups.
+
+    Each signup is one line written with a single O_APPEND write, so signup
+    cost doesn't depend on how many registrations exist and two processes
+    appending at once can't drop each other's entries.  fsync is batched
+    (every REG_FSYNC_EVERY appends or REG_FSYNC_INTERVAL seconds, and at
+    exit).  Entries from an old registrations.json array are still read,
+    and get folded into the journal by compact().
+    """
+
+    def __init__(self, path=REG_LOG_FILE, legacy_path=REG_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._fd = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._appends = 0
+        atexit.register(self.close)
+
+    def locked(self):
+        # Held by appenders and by compact(), across processes
+        return file_lock(self.path + ".lock")
+
+    def _open(self):
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self._fd).st_ino:
+                # Another process compacted the journal; our fd points at the replaced file
+                os.close(self._fd)
+                self._fd = None
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            # Terminate a torn last line so the next entry doesn't get glued onto it
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        os.write(self._fd, b"\n")
+        return self._fd
+
+    def append(self, entry):
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock, self.locked():
+            fd = self._open()
+            os.write(fd, line)
+            self._unsynced += 1
+            self._appends += 1
+            now = time.monotonic()
+            if self._unsynced >= REG_FSYNC_EVERY or now - self._last_sync >= REG_FSYNC_INTERVAL:
+                self._sync(now)
+            compact_due = self._appends >= REG_COMPACT_EVERY
+        if compact_due:
+            self.compact()
+
+    def _sync(self, now=None):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_sync = now if now is not None else time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+                os.close(self._fd)
+                self._fd = None
+
+    def __iter__(self):
+        # Legacy array first (it predates the journal), then journal lines in order
+        for entry in safe_json_load(self.legacy_path, []):
+            yield entry
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-append; compact() drops it
+                    continue
+
+    def compact(self):
+        """Rewrite legacy entries + journal as one clean journal.
+
+        Every entry is kept; only blank and torn lines are dropped.  The
+        legacy registrations.json is kept as <name>.bak rather than deleted.
+        Appenders in other processes wait on the same file lock and reopen
+        the journal when they see it was replaced.
+        """
+        with self._lock, self.locked():
+            self._sync()
+            self._appends = 0
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as out:
+                for entry in self:
+                    out.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            os.replace(tmp, self.path)
+            if os.path.exists(self.legacy_path):
+                os.replace(self.legacy_path, self.legacy_path + ".bak")
+
+
+# ----------------------------
+# JSON backend
+# ----------------------------
+class JsonBackend:
+    name = "json"
+
+    def __init__(self, db_file=DB_FILE, reg_file=REG_FILE, reg_log_file=REG_LOG_FILE, serializer=None):
+        self.serializer = serializers.get_serializer(serializer)
+        self.legacy_db_file = None
+        base, ext = os.path.splitext(db_file)
+        if ext != self.serializer.extension:
+            # e.g. users.json -> users.ikdb; the old file is read until the first save
+            self.legacy_db_file = db_file
+            db_file = base + self.serializer.extension
+        self.db_file = db_file
+        self.reg_file = reg_file
+        self.registrations = RegistrationLog(reg_log_file, reg_file)
+
+    def load_users(self):
+        if self.legacy_db_file and not os.path.exists(self.db_file):
+            return decode_users(safe_json_load(self.legacy_db_file, {}))
+        return decode_users(safe_load(self.db_file, {}, self.serializer.loads))
+
+    def locked(self):
+        return file_lock(self.db_file + ".lock")
+
+    def save_users(self, users):
+        with self.locked():
+            atomic_write(self.db_file, self.serializer.dumps(encode_users(users)))
+
+    def load_user(self, email):
+        return self.load_users().get(email)
+
+    def save_user(self, email, user):
+        self.save_accounts({email: user})
+
+    def save_accounts(self, accounts, users=None, signature=None):
+        """Write accounts; returns the new signature if nobody else wrote since `signature`.
+
+        The file only holds the whole mapping, so callers that already have
+        it up to date (the account cache) pass it in to skip the re-read.
+        """
+        with self.locked():
+            unchanged = signature is not None and self.signature() == signature
+            if users is None or not unchanged:
+                users = self.load_users()
+                users.update(accounts)
+            atomic_write(self.db_file, self.serializer.dumps(encode_users(users)))
+            return self.signature() if unchanged else None
+
+    def compare_and_swap(self, email, expected_rev, user, users=None, signature=None):
+        """Store user only if the stored account is still at expected_rev.
+
+        Returns (ok, signature) like save_accounts.  On success user["rev"]
+        is bumped to the new revision.
+        """
+        return self.compare_and_swap_many({email: (expected_rev, user)}, users, signature)
+
+    def compare_and_swap_many(self, swaps, users=None, signature=None):
+        """All-or-nothing compare_and_swap over {email: (expected_rev, user)}."""
+        with self.locked():
+            unchanged = signature is not None and self.signature() == signature
+            users = dict(users) if users is not None and unchanged else self.load_users()
+            if any(account_rev(users.get(email)) != expected for email, (expected, _) in swaps.items()):
+                return False, None
+            for email, (expected, user) in swaps.items():
+                user["rev"] = (expected or 0) + 1
+                users[email] = user
+            atomic_write(self.db_file, self.serializer.dumps(encode_users(users)))
+            return True, (self.signature() if unchanged else None)
+
+    def signature(self):
+        path = self.db_file
+        if self.legacy_db_file and not os.path.exists(path):
+            path = self.legacy_db_file
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (path, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def iter_registrations(self):
+        return iter(self.registrations)
+
+    def load_registrations(self):
+        return list(self.registrations)
+
+    def save_registration(self, entry):
+        self.registrations.append(entry)
+
+    def close(self):
+        self.registrations.close()
+
+
+# ----------------------------
+# Sharded backend
+# ----------------------------
+class ShardedBackend:
+    """One file per account under a hashed directory tree.
+
+    accounts/3f/a2/3fa2...e1.json holds a single {email: account} mapping.
+    Each account has its own lock file, so sessions trading for different
+    users (Tk app and Streamlit app, several processes) never wait on each
+    other, and a save can only ever replace the account it is about.
+    A _version file holds a counter bumped after every write, so caches can
+    tell that something changed without walking the tree.
+    """
+
+    name = "sharded"
+
+    def __init__(self, root=SHARD_DIR, reg_file=REG_FILE, reg_log_file=REG_LOG_FILE, serializer=None):
+        self.root = root
+        self.serializer = serializers.get_serializer(serializer)
+        self.version_file = os.path.join(root, "_version")
+        os.makedirs(root, exist_ok=True)
+        self.registrations = RegistrationLog(reg_log_file, reg_file)
+
+    def shard_path(self, email):
+        h = hashlib.sha1(email.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, h[:2], h[2:4], h + self.serializer.extension)
+
+    @contextmanager
+    def locked(self, email):
+        path = self.shard_path(email)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with file_lock(path + ".lock"):
+            yield path
+
+    def _bump_version(self, signature=None):
+        """Advance the version; returns the new one if it was still `signature` until now."""
+        # Compared and bumped under one lock, so another process's write can't slip in between
+        with file_lock(self.version_file + ".lock"):
+            current = self.signature()
+            with open(self.version_file, "w") as f:
+                f.write(str((current or 0) + 1))
+            return current + 1 if signature is not None and current == signature else None
+
+    def _read(self, path):
+        data = safe_load(path, {}, self.serializer.loads)
+        email, user = next(iter(data.items()), (None, None))
+        return email, holdings.decode_account(user)
+
+    def _write(self, path, email, user):
+        atomic_write(path, self.serializer.dumps({email: holdings.encode_account(user)}))
+
+    def _shard_files(self):
+        ext = self.serializer.extension
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for fn in sorted(filenames):
+                if fn.endswith(ext) and not fn.startswith("_"):
+                    yield os.path.join(dirpath, fn)
+
+    # -- accounts --
+    def load_users(self):
+        users = {}
+        for path in self._shard_files():
+            email, user = self._read(path)
+            if email is not None:
+                users[email] = user
+        return users
+
+    def load_user(self, email):
+        found, user = self._read(self.shard_path(email))
+        return user if found == email else None
+
+    def save_user(self, email, user):
+        self.save_accounts({email: user})
+
+    def save_accounts(self, accounts, users=None, signature=None):
+        if not accounts:
+            return signature if signature is not None and self.signature() == signature else None
+        for email, user in accounts.items():
+            with self.locked(email) as path:
+                self._write(path, email, user)
+        return self._bump_version(signature)
+
+    def compare_and_swap(self, email, expected_rev, user, users=None, signature=None):
+        return self.compare_and_swap_many({email: (expected_rev, user)}, users, signature)
+
+    def compare_and_swap_many(self, swaps, users=None, signature=None):
+        with ExitStack() as stack:
+            # Sorted lock order so two batches over the same accounts can't deadlock
+            paths = {email: stack.enter_context(self.locked(email)) for email in sorted(swaps)}
+            for email, (expected, _) in swaps.items():
+                found, current = self._read(paths[email])
+                if account_rev(current if found == email else None) != expected:
+                    return False, None
+            for email, (expected, user) in swaps.items():
+                user["rev"] = (expected or 0) + 1
+                self._write(paths[email], email, user)
+            return True, self._bump_version(signature)
+
+    def save_users(self, users):
+        for path in self._shard_files():
+            email, _ = self._read(path)
+            if email is not None and email not in users:
+                with self.locked(email):
+                    os.remove(path)
+        self.save_accounts(users)
+
+    def signature(self):
+        try:
+            with open(self.version_file) as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None  # missing, or mid-bump: callers just reload
+
+    # -- registrations --
+    def iter_registrations(self):
+        return iter(self.registrations)
+
+    def load_registrations(self):
+        return list(self.registrations)
+
+    def save_registration(self, entry):
+        self.registrations.append(entry)
+
+    def close(self):
+        self.registrations.close()
+
+
+def migrate_json_to_shards(db_file=DB_FILE, root=SHARD_DIR):
+    """Split users.json into per-account shard files (registrations are shared already)."""
+    users = safe_json_load(db_file, {})
+    backend = ShardedBackend(root)
+    try:
+        if backend.signature() is not None:
+            raise RuntimeError(f"{root}/ already contains accounts; not migrating again.")
+        backend.save_accounts(users)
+        return len(users)
+    finally:
+        backend.close()
+
+
+# ----------------------------
+# SQLite backend
+# ----------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    email    TEXT PRIMARY KEY,
+    name     TEXT,
+    password TEXT,
+    balance  REAL NOT NULL DEFAULT 0,
+    bonus    REAL,
+    created  TEXT,
+    extra    TEXT NOT NULL DEFAULT '{}',
+    rev      INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    email   TEXT NOT NULL REFERENCES accounts(email) ON DELETE CASCADE,
+    bucket  TEXT NOT NULL,
+    company TEXT NOT NULL,
+    qty     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, bucket, company)
+);
+CREATE TABLE IF NOT EXISTS registrations (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    email   TEXT,
+    name    TEXT,
+    payload TEXT NOT NULL
+);
+"""
+
+
+def _num(value):
+    # Keep whole numbers as int so balances round-trip the same as in users.json
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _bucket_of(symbol):
+    inst = instruments.lookup(symbol)
+    return inst.bucket if inst else "other"
+
+
+class SqliteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(accounts)")}
+        if "rev" not in columns:
+            # Databases migrated before accounts were versioned
+            self._conn.execute("ALTER TABLE accounts ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+
+    # -- row <-> dict --
+    def _row_to_user(self, row, positions):
+        email, name, password, balance, bonus, created, extra, rev = row
+        user = {"name": name, "password": password, "balance": _num(balance), "rev": rev,
+                "holdings": holdings.Holdings.from_sparse(positions)}
+        if bonus is not None:
+            user["bonus"] = _num(bonus)
+        if created is not None:
+            user["created"] = created
+        user.update(json.loads(extra))
+        return user
+
+    def _write_user(self, email, user):
+        extra = {k: v for k, v in user.items() if k not in ACCOUNT_COLUMNS and k not in HOLDING_KEYS}
+        h = user.get("holdings")
+        if not isinstance(h, holdings.Holdings):
+            h = holdings.Holdings.from_legacy(user)
+        self._conn.execute(
+            "INSERT INTO accounts (email, name, password, balance, bonus, created, extra, rev) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(email) DO UPDATE SET name=excluded.name, password=excluded.password, "
+            "balance=excluded.balance, bonus=excluded.bonus, created=excluded.created, extra=excluded.extra, "
+            "rev=excluded.rev",
+            (email, user.get("name"), user.get("password"), user.get("balance", 0),
+             user.get("bonus"), user.get("created"), json.dumps(extra, ensure_ascii=False), user.get("rev", 0))
+        )
+        self._conn.execute("DELETE FROM holdings WHERE email = ?", (email,))
+        # Only non-zero positions get a row
+        self._conn.executemany(
+            "INSERT INTO holdings (email, bucket, company, qty) VALUES (?, ?, ?, ?)",
+            [(email, _bucket_of(company), company, qty) for company, qty in h.items()]
+        )
+
+    def _read_holdings(self, email=None):
+        if email is None:
+            rows = self._conn.execute("SELECT email, bucket, company, qty FROM holdings ORDER BY rowid")
+        else:
+            rows = self._conn.execute(
+                "SELECT email, bucket, company, qty FROM holdings WHERE email = ? ORDER BY rowid", (email,))
+        positions = {}
+        for e, bucket, company, qty in rows:
+            if qty:
+                positions.setdefault(e, {})[company] = positions.get(e, {}).get(company, 0) + qty
+        return positions
+
+    # -- accounts --
+    def load_users(self):
+        with self._lock:
+            holdings = self._read_holdings()
+            rows = self._conn.execute(
+                "SELECT email, name, password, balance, bonus, created, extra, rev FROM accounts ORDER BY rowid").fetchall()
+        return {row[0]: self._row_to_user(row, holdings.get(row[0], {})) for row in rows}
+
+    def load_user(self, email):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT email, name, password, balance, bonus, created, extra, rev FROM accounts WHERE email = ?",
+                (email,)).fetchone()
+            if row is None:
+                return None
+            holdings = self._read_holdings(email)
+        return self._row_to_user(row, holdings.get(email, {}))
+
+    def save_user(self, email, user):
+        self.save_accounts({email: user})
+
+    def save_accounts(self, accounts, users=None, signature=None):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            # Checked inside the write transaction, so no other connection can commit in between
+            unchanged = signature is not None and self._data_version() == signature
+            try:
+                for email, user in accounts.items():
+                    self._write_user(email, user)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return self._data_version() if unchanged else None
+
+    def compare_and_swap(self, email, expected_rev, user, users=None, signature=None):
+        return self.compare_and_swap_many({email: (expected_rev, user)}, users, signature)
+
+    def compare_and_swap_many(self, swaps, users=None, signature=None):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            unchanged = signature is not None and self._data_version() == signature
+            try:
+                for email, (expected, _) in swaps.items():
+                    row = self._conn.execute("SELECT rev FROM accounts WHERE email = ?", (email,)).fetchone()
+                    if (row[0] if row else None) != expected:
+                        self._conn.execute("ROLLBACK")
+                        return False, None
+                for email, (expected, user) in swaps.items():
+                    user["rev"] = (expected or 0) + 1
+                    self._write_user(email, user)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return True, (self._data_version() if unchanged else None)
+
+    def _data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def signature(self):
+        # data_version changes whenever another connection commits
+        with self._lock:
+            return self._data_version()
+
+    def save_users(self, users):
+        # Whole-dict save kept for callers that still work on the full mapping
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = {r[0] for r in self._conn.execute("SELECT email FROM accounts")}
+                for email in existing - set(users):
+                    self._conn.execute("DELETE FROM accounts WHERE email = ?", (email,))
+                for email, user in users.items():
+                    self._write_user(email, user)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # -- registrations --
+    def iter_registrations(self, chunk=1000):
+        # Keyset pages, so a big table is never held in memory (or under the lock) at once
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM registrations WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk)
+                ).fetchall()
+            for _, payload in rows:
+                yield json.loads(payload)
+            if len(rows) < chunk:
+                return
+            last_id = rows[-1][0]
+
+    def load_registrations(self):
+        return list(self.iter_registrations())
+
+    def save_registration(self, entry):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO registrations (email, name, payload) VALUES (?, ?, ?)",
+                (entry.get("email"), entry.get("name"), json.dumps(entry, ensure_ascii=False))
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ----------------------------
+# Backend selection / migration
+# ----------------------------
+BACKENDS = {
+    "json": JsonBackend,
+    "sqlite": SqliteBackend,
+    "sharded": ShardedBackend,
+}
+
+
+def get_backend(kind=None, db_file=DB_FILE, reg_file=REG_FILE, sqlite_file=SQLITE_FILE,
+                reg_log_file=REG_LOG_FILE, serializer=None, shard_dir=SHARD_DIR):
+    kind = (kind or STORAGE_BACKEND).lower()
+    if kind == "json":
+        return JsonBackend(db_file, reg_file, reg_log_file, serializer)
+    if kind == "sqlite":
+        return SqliteBackend(sqlite_file)
+    if kind == "sharded":
+        return ShardedBackend(shard_dir, reg_file, reg_log_file, serializer)
+    raise ValueError(f"Unknown storage backend: {kind!r} (expected one of {', '.join(BACKENDS)})")
+
+
+def migrate_json_to_sqlite(db_file=DB_FILE, reg_file=REG_FILE, sqlite_file=SQLITE_FILE,
+                           reg_log_file=REG_LOG_FILE):
+    """Copy users.json and the registration files into a SQLite database once.
+
+    Refuses to run if the database already holds accounts, so it can't be
+    used to overwrite live data by accident.
+    """
+    src = JsonBackend(db_file, reg_file, reg_log_file)
+    dst = SqliteBackend(sqlite_file)
+    try:
+        if dst._conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]:
+            raise RuntimeError(f"{sqlite_file} already contains accounts; not migrating again.")
+        users = src.load_users()
+        regs = src.load_registrations()
+        dst.save_users(users)
+        with dst._lock:
+            dst._conn.execute("BEGIN IMMEDIATE")
+            dst._conn.executemany(
+                "INSERT INTO registrations (email, name, payload) VALUES (?, ?, ?)",
+                [(r.get("email"), r.get("name"), json.dumps(r, ensure_ascii=False)) for r in regs]
+            )
+            dst._conn.execute("COMMIT")
+        return len(users), len(regs)
+    finally:
+        src.close()
+        dst.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        if len(sys.argv) >= 3 and sys.argv[2] == "sharded":
+            n_users = migrate_json_to_shards()
+            print(f"Split {n_users} accounts into {SHARD_DIR}/")
+        else:
+            n_users, n_regs = migrate_json_to_sqlite()
+            print(f"Migrated {n_users} accounts and {n_regs} registrations into {SQLITE_FILE}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "compact":
+        RegistrationLog().compact()
+        print(f"Compacted registrations into {REG_LOG_FILE}")
+    else:
+        print("Usage: python storage.py migrate [sharded] | compact")
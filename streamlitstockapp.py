@@ -6,42 +6,26 @@ Run:
     streamlit run streamlit_stock_app.py
 """
 
-import os
-import json
-import numpy as np
-import matplotlib.pyplot as plt
 import streamlit as st
 
+import accounts
+import chart_render
+import holdings
+import instruments
+import market
+import paths
+import trading_engine
+
 # ----------------------------
 # Config / Files / Data
 # ----------------------------
 DB_FILE = "users.json"
 REG_FILE = "registrations.json"
 
-AUTO_COMPANIES = {
-    "Honda": 10,
-    "Hyundai": 10,
-    "Tata Motors": 10,
-    "Mahindra & Mahindra": 10,
-    "Maruti Suzuki": 10,
-    "Ashok Leyland": 10
-}
-PETROLEUM_COMPANIES = {
-    "Reliance Industries": 15,
-    "Indian Oil Corporation": 15,
-    "Bharat Petroleum": 15,
-    "Hindustan Petroleum": 15,
-    "Oil India": 15
-}
-STEEL_COMPANIES = {
-    "Tata Steel": 20,
-    "JSW Steel": 20,
-    "Steel Authority of India (SAIL)": 20,
-    "Jindal Steel & Power": 20,
-    "NMDC Steel": 20
-}
-
-PRICES = {**AUTO_COMPANIES, **PETROLEUM_COMPANIES, **STEEL_COMPANIES}
+# Streamlit has no timer: every rerun catches the shared market up to the wall clock
+MARKET = market.get_market()
+MARKET.catch_up()
+PRICES = MARKET.prices
 
 # Chart defaults
 CHART_PRICE_START = 100.0
@@ -49,56 +33,37 @@ CHART_STEP_STD = 0.5
 CHART_POINTS = 200
 
 # ----------------------------
-# JSON helpers
+# Storage helpers
 # ----------------------------
-def safe_json_load(path, default):
-    if not os.path.exists(path):
-        return default
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return default
-
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+ACCOUNTS = accounts.get_repository(db_file=DB_FILE, reg_file=REG_FILE)
+STORAGE = ACCOUNTS.backend
 
 def load_users():
-    return safe_json_load(DB_FILE, {})
+    return ACCOUNTS.all()
 
-def save_users(users):
-    save_json(DB_FILE, users)
+ENGINE = trading_engine.TradingEngine(ACCOUNTS, PRICES, instruments.BUCKETS)
 
 def load_registrations():
-    return safe_json_load(REG_FILE, [])
+    return STORAGE.load_registrations()
 
 def save_registration(entry):
-    data = load_registrations()
-    data.append(entry)
-    save_json(REG_FILE, data)
+    STORAGE.save_registration(entry)
 
 # ----------------------------
 # Dummy Trading Chart
 # ----------------------------
-def plot_dummy_chart(entry_price=CHART_PRICE_START, side="BUY"):
-    xs = []
-    ys = []
-    last = entry_price
-    for i in range(CHART_POINTS):
-        step = np.random.normal(loc=0.0, scale=CHART_STEP_STD)
-        last = max(1, last + step)
-        xs.append(i)
-        ys.append(last)
-
-    fig, ax = plt.subplots(figsize=(8,4))
-    ax.plot(xs, ys, label="Price")
-    ax.axhline(entry_price, color="blue", linestyle="--", label="Entry")
-    ax.set_title(f"Dummy Trading Chart ({side})")
-    ax.set_xlabel("Ticks")
-    ax.set_ylabel("Price")
-
-    current = ys[-1]
+def plot_dummy_chart(entry_price=CHART_PRICE_START, side="BUY", company=None):
+    if company:
+        # The company's live candles; reruns within the same market tick are served from cache
+        current = MARKET.price(company)
+        image = chart_render.render_png(company, window=CHART_POINTS, entry=entry_price,
+                                        title=f"{company} ({side})", mkt=MARKET)
+    else:
+        # A fresh random path from the entry price, in one vectorized call
+        rows = paths.generate_candles([entry_price], CHART_POINTS, CHART_STEP_STD, min_price=1)[:, 0]
+        current = rows[-1, paths.CLOSE]
+        image = chart_render.render_ohlc(rows, kind="line", entry=entry_price, title=f"Dummy Trading Chart ({side})")
+
     if side == "BUY":
         pl = current - entry_price
     else:
@@ -107,9 +72,7 @@ def plot_dummy_chart(entry_price=CHART_PRICE_START, side="BUY"):
 
     st.write(f"📊 Current Price: {current:.2f}")
     st.write(f"💰 P/L: {pl:.2f} ({pct:.2f}%)")
-
-    ax.legend()
-    st.pyplot(fig)
+    st.image(image)
 
 # ----------------------------
 # Streamlit App
@@ -124,20 +87,16 @@ if menu == "Register":
     email = st.text_input("Email")
     password = st.text_input("Password", type="password")
     if st.button("Register"):
-        users = load_users()
-        if email in users:
+        account = {
+            "name": name,
+            "password": password,
+            "balance": 100,
+            "holdings": holdings.Holdings(),
+            "bonus": 100
+        }
+        if not ENGINE.signup(email, account):
             st.error("Email already registered!")
         else:
-            users[email] = {
-                "name": name,
-                "password": password,
-                "balance": 100,
-                "shares": {c: 0 for c in AUTO_COMPANIES},
-                "petroleum_shares": {c: 0 for c in PETROLEUM_COMPANIES},
-                "steel_shares": {c: 0 for c in STEEL_COMPANIES},
-                "bonus": 100
-            }
-            save_users(users)
             save_registration({"name": name, "email": email, "bonus": 100})
             st.success("✅ Registration successful! You got ₹100 bonus.")
 
@@ -157,15 +116,10 @@ elif menu == "Login":
         user_email = st.session_state["user"]
         user = load_users()[user_email]
         st.write(f"### Welcome {user['name']} 👋")
-        st.write(f"💵 Balance: ₹{user['balance']}")
+        st.write(f"💵 Balance: ₹{user['balance']:.2f}")
 
-        sector = st.selectbox("Select Sector", ["Automobile", "Petroleum", "Steel"])
-        if sector == "Automobile":
-            companies = AUTO_COMPANIES
-        elif sector == "Petroleum":
-            companies = PETROLEUM_COMPANIES
-        else:
-            companies = STEEL_COMPANIES
+        sector = st.selectbox("Select Sector", instruments.SECTOR_LABELS)
+        companies = instruments.SECTORS_BY_LABEL[sector].companies
 
         company = st.selectbox("Select Company", list(companies.keys()))
         qty = st.number_input("Quantity", min_value=1, value=1)
@@ -173,49 +127,24 @@ elif menu == "Login":
         st.write(f"💰 Price per share: ₹{price}")
 
         if st.button("Buy"):
-            cost = price * qty
-            if user["balance"] >= cost:
-                user["balance"] -= cost
-                if company in user["shares"]:
-                    user["shares"][company] += qty
-                elif company in user["petroleum_shares"]:
-                    user["petroleum_shares"][company] += qty
-                elif company in user["steel_shares"]:
-                    user["steel_shares"][company] += qty
-                users = load_users()
-                users[user_email] = user
-                save_users(users)
-                st.success(f"Bought {qty} shares of {company} for ₹{cost}")
-            else:
-                st.error("Insufficient balance")
+            try:
+                user, cost = ENGINE.execute(user_email, trading_engine.BUY, company, int(qty))
+                st.success(f"Bought {qty} shares of {company} for ₹{cost:.2f}")
+            except (trading_engine.TradeError, trading_engine.ConflictError) as e:
+                st.error(str(e))
 
         if st.button("Sell"):
-            if company in user["shares"] and user["shares"][company] >= qty:
-                user["shares"][company] -= qty
-                user["balance"] += price * qty
-            elif company in user["petroleum_shares"] and user["petroleum_shares"][company] >= qty:
-                user["petroleum_shares"][company] -= qty
-                user["balance"] += price * qty
-            elif company in user["steel_shares"] and user["steel_shares"][company] >= qty:
-                user["steel_shares"][company] -= qty
-                user["balance"] += price * qty
-            else:
-                st.error("Not enough shares to sell")
-                st.stop()
-            users = load_users()
-            users[user_email] = user
-            save_users(users)
-            st.success(f"Sold {qty} shares of {company} for ₹{price*qty}")
+            try:
+                user, earnings = ENGINE.execute(user_email, trading_engine.SELL, company, int(qty))
+                st.success(f"Sold {qty} shares of {company} for ₹{earnings:.2f}")
+            except (trading_engine.TradeError, trading_engine.ConflictError) as e:
+                st.error(str(e))
 
         st.write("### Portfolio")
-        st.json({
-            "Automobile": user["shares"],
-            "Petroleum": user["petroleum_shares"],
-            "Steel": user["steel_shares"]
-        })
+        st.json({s.label: user["holdings"].sector(s.key) for s in instruments.SECTORS})
 
         if st.button("📊 Open Dummy Trading Chart"):
-            plot_dummy_chart(entry_price=price, side="BUY")
+            plot_dummy_chart(entry_price=price, side="BUY", company=company)
 
 elif menu == "Admin":
     st.subheader("Admin Panel")
@@ -0,0 +1,86 @@
+"""
+tick_pump.py
+
+Hands data produced on a worker thread to the Tk main thread.
+
+A worker thread calls produce() every `interval` seconds and puts the
+result on a bounded queue, waiting when the queue is full.  On the main
+thread an after() callback every frame_ms passes whatever is queued to
+consume(items) in one batch, so Tk is only touched from mainloop's thread.
+
+    pump = TickPump(chart_win, produce=next_candle, consume=draw_candles, interval=0.8)
+    pump.start()
+    pump.discard()    # drop queued items, e.g. after a manual price override
+    pump.stop()       # also happens when chart_win is destroyed
+"""
+
+import queue
+import threading
+
+FRAME_MS = 50       # how often the main thread looks at the queue (~20 fps)
+MAX_PENDING = 64    # items the worker may get ahead of the display
+
+
+class TickPump:
+    def __init__(self, widget, produce, consume, interval, frame_ms=FRAME_MS, max_pending=MAX_PENDING):
+        self.widget = widget
+        self.produce = produce
+        self.consume = consume
+        self.interval = interval
+        self.frame_ms = frame_ms
+        self.queue = queue.Queue(max_pending)
+        self._stop = threading.Event()
+        self._thread = None
+        self._after_id = None
+        widget.bind("<Destroy>", self._on_destroy, add="+")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tick-pump", daemon=True)
+        self._thread.start()
+        self._after_id = self.widget.after(self.frame_ms, self._pump)
+
+    def stop(self):
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass  # widget already gone
+            self._after_id = None
+
+    def discard(self):
+        """Drop everything queued but not yet consumed."""
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    # -- worker thread: no Tk calls here --
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            item = self.produce()
+            while not self._stop.is_set():
+                try:
+                    self.queue.put(item, timeout=self.interval)
+                    break
+                except queue.Full:
+                    continue
+
+    # -- main thread --
+    def _pump(self):
+        self._after_id = None
+        items = []
+        try:
+            while True:
+                items.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        if items:
+            self.consume(items)
+        if not self._stop.is_set():
+            self._after_id = self.widget.after(self.frame_ms, self._pump)
+
+    def _on_destroy(self, event):
+        if event.widget is self.widget:
+            self.stop()
@@ -12,6 +12,7 @@ Run:
 
 import os
 import json
+import threading
 import webbrowser
 import tkinter as tk
 from tkinter import messagebox, ttk
@@ -20,9 +21,14 @@ from PIL import Image, ImageTk
 # Matplotlib imports for embedded chart
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+import holdings
+import instruments
+import storage
+from ohlc_buffer import OHLCBuffer
+from tick_pump import TickPump
+
 # ----------------------------
 # Config / Files / Data
 # ----------------------------
@@ -91,11 +97,12 @@ def save_json(path, data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
 
+# Accounts are kept in the shared layout: one sparse "holdings" dict per account
 def load_users():
-    return safe_json_load(DB_FILE, {})
+    return storage.decode_users(safe_json_load(DB_FILE, {}))
 
 def save_users(users):
-    save_json(DB_FILE, users)
+    save_json(DB_FILE, storage.encode_users(users))
 
 def load_registrations():
     return safe_json_load(REG_FILE, [])
@@ -123,9 +130,6 @@ def open_link(url):
 # ----------------------------
 # Registration & User logic
 # ----------------------------
-def get_default_shares(company_dict):
-    return {company: 0 for company in company_dict.keys()}
-
 def register_user_callback(entry_name, entry_email, entry_password):
     name = entry_name.get().strip()
     email = entry_email.get().strip()
@@ -144,9 +148,7 @@ def register_user_callback(entry_name, entry_email, entry_password):
         "name": name,
         "password": password,
         "balance": 100,
-        "shares": get_default_shares(AUTO_COMPANIES),
-        "petroleum_shares": get_default_shares(PETROLEUM_COMPANIES),
-        "steel_shares": get_default_shares(STEEL_COMPANIES),
+        "holdings": holdings.Holdings(),
         "bonus": 100
     }
     save_users(users)
@@ -163,9 +165,8 @@ def open_dummy_candlestick_chart(entry_price=None, side="BUY", title="Dummy Cand
     ENTRY_PRICE = float(entry_price) if entry_price is not None else float(CHART_PRICE_START)
     SIDE = side.upper()
     import pandas as pd
-    xs = []
-    # We store OHLC data as dictionaries
-    ohlc_data = []
+    # Last CHART_MAX_POINTS candles; older ones are overwritten in place
+    ohlc_data = OHLCBuffer(CHART_MAX_POINTS)
 
     chart_win = tk.Toplevel(root)
     chart_win.title(title)
@@ -211,7 +212,7 @@ def open_dummy_candlestick_chart(entry_price=None, side="BUY", title="Dummy Cand
     def redraw_chart():
         # Prepare DataFrame for mplfinance
         if len(state["ohlc"]) > 0:
-            df = pd.DataFrame(state["ohlc"], columns=["Open","High","Low","Close"])
+            df = pd.DataFrame(state["ohlc"].view()[:, :4], columns=["Open","High","Low","Close"])
             df['Volume'] = 1
             df.index = pd.date_range(start="2024-01-01", periods=len(df), freq='T')
             ax.clear()
@@ -230,14 +231,27 @@ def open_dummy_candlestick_chart(entry_price=None, side="BUY", title="Dummy Cand
             ax.legend(facecolor="gray", edgecolor="white", labelcolor="white")
         canvas.draw()
 
-    def update_chart(frame=None):
-        last_close = state['last_close']
-        o, h, l, c = simulate_next_ohlc(last_close)
-        state['ohlc'].append([o,h,l,c])
-        state['last_close'] = c
-        state['counter'] += 1
+    # Simulation runs on the pump's worker thread; sim is shared with it under sim_lock
+    sim_lock = threading.Lock()
+    sim = {"close": ENTRY_PRICE, "gen": 0}
+
+    def next_candle():
+        with sim_lock:
+            candle = simulate_next_ohlc(sim["close"])
+            sim["close"] = candle[3]
+            return sim["gen"], candle
+
+    def update_chart(batch):
+        # Main thread: every candle produced since the last frame, one redraw
+        fresh = [candle for gen, candle in batch if gen == sim["gen"]]
+        if not fresh:
+            return
+        for o, h, l, c in fresh:
+            state['ohlc'].append(o, h, l, c)
+            state['last_close'] = c
+            state['counter'] += 1
         redraw_chart()
-    
+
     def submit_manual_price():
         val = price_entry.get().strip()
         try:
@@ -245,10 +259,14 @@ def open_dummy_candlestick_chart(entry_price=None, side="BUY", title="Dummy Cand
             if manual_close <= 0:
                 messagebox.showerror("Error", "Enter a positive price.")
                 return
+            with sim_lock:
+                sim["close"] = manual_close
+                sim["gen"] += 1
+            pump.discard()
             # Simulate Open/High/Low around this Close
             last_close = state['last_close']
             o, h, l, c = simulate_next_ohlc(last_close)
-            state['ohlc'].append([o,h,l,manual_close])
+            state['ohlc'].append(o, h, l, manual_close)
             state['last_close'] = manual_close
             state['counter'] += 1
             redraw_chart()
@@ -257,23 +275,12 @@ def open_dummy_candlestick_chart(entry_price=None, side="BUY", title="Dummy Cand
             messagebox.showerror("Error", "Please enter a valid number.")
 
     def close_chart():
-        try:
-            chart_win.anim.event_source.stop()
-        except Exception:
-            pass
+        pump.stop()
         chart_win.destroy()
-    
-    # Timer/Animation
-    import threading
-    stop_flag = [False]
-    def run_anim():
-        while not stop_flag[0]:
-            chart_win.after(CHART_UPDATE_INTERVAL, update_chart)
-            chart_win.update_idletasks()
-            chart_win.after(CHART_UPDATE_INTERVAL)
-
-    chart_win.anim_thread = threading.Thread(target=run_anim, daemon=True)
-    chart_win.anim_thread.start()
+
+    # Worker produces a candle every CHART_UPDATE_INTERVAL; the main thread draws them
+    pump = TickPump(chart_win, produce=next_candle, consume=update_chart, interval=CHART_UPDATE_INTERVAL / 1000)
+    pump.start()
     
     # --- UI For Custom Dummy Price ---
     control_frame = tk.Frame(chart_win, bg="black")
@@ -285,7 +292,7 @@ def open_dummy_candlestick_chart(entry_price=None, side="BUY", title="Dummy Cand
     tk.Button(control_frame, text="Submit", font=("Arial", 11, "bold"),
               bg="white", fg="black", command=submit_manual_price).pack(side=tk.LEFT, padx=6)
     tk.Button(control_frame, text="Close Chart", font=("Arial", 11, "bold"),
-              bg="red", fg="white", command=lambda: [stop_flag.__setitem__(0, True), close_chart()]).pack(side=tk.RIGHT, padx=8)
+              bg="red", fg="white", command=close_chart).pack(side=tk.RIGHT, padx=8)
 
 # ----------------------------
 # Buy/Sell Window
@@ -347,6 +354,8 @@ def buy_sell_window(user_email):
     qty_entry.pack(pady=5)
 
     def commit_and_refresh():
+        # A new revision, so the main app's compare-and-swap sees this change
+        user_data["rev"] = storage.account_rev(user_data) + 1
         save_users(users)
         bal_var.set(f"Balance: ₹{user_data['balance']}")
 
@@ -366,12 +375,8 @@ def buy_sell_window(user_email):
             messagebox.showerror("Error", f"Insufficient balance. Need ₹{cost}, have ₹{user_data['balance']}.")
             return
         user_data["balance"] -= cost
-        if company in user_data["shares"]:
-            user_data["shares"][company] += qty
-        elif company in user_data["petroleum_shares"]:
-            user_data["petroleum_shares"][company] += qty
-        elif company in user_data["steel_shares"]:
-            user_data["steel_shares"][company] += qty
+        if company in PRICES:
+            user_data["holdings"][company] = instruments.shares_owned(user_data, company) + qty
         commit_and_refresh()
         messagebox.showinfo("Success", f"Bought {qty} shares of {company} for ₹{cost}.")
 
@@ -386,23 +391,14 @@ def buy_sell_window(user_email):
             return
         qty = int(qty_txt)
 
-        portfolio_key = None
-        if company in user_data["shares"]:
-            portfolio_key = "shares"
-        elif company in user_data["petroleum_shares"]:
-            portfolio_key = "petroleum_shares"
-        elif company in user_data["steel_shares"]:
-            portfolio_key = "steel_shares"
-
-        if portfolio_key is None:
+        if company not in PRICES:
             messagebox.showerror("Error", "Invalid company.")
             return
-
-        if user_data[portfolio_key].get(company, 0) < qty:
+        owned = instruments.shares_owned(user_data, company)
+        if owned < qty:
             messagebox.showerror("Error", "Not enough shares to sell.")
             return
-
-        user_data[portfolio_key][company] -= qty
+        user_data["holdings"][company] = owned - qty
         earnings = PRICES.get(company, 0) * qty
         user_data["balance"] += earnings
         commit_and_refresh()
@@ -426,7 +422,7 @@ def show_auto_shares_window(user_email):
         messagebox.showerror("Error", "User not found.")
         return
     user_data = users[user_email]
-    shares_data = user_data.get("shares", {})
+    shares_data = {c: instruments.shares_owned(user_data, c) for c in AUTO_COMPANIES}
     win = tk.Toplevel(root)
     win.title(f"{user_data['name']}'s Automobile Portfolio")
     for company, qty in shares_data.items():
@@ -438,7 +434,7 @@ def show_petroleum_shares_window(user_email):
         messagebox.showerror("Error", "User not found.")
         return
     user_data = users[user_email]
-    shares_data = user_data.get("petroleum_shares", {})
+    shares_data = {c: instruments.shares_owned(user_data, c) for c in PETROLEUM_COMPANIES}
     win = tk.Toplevel(root)
     win.title(f"{user_data['name']}'s Petroleum Portfolio")
     for company, qty in shares_data.items():
@@ -450,7 +446,7 @@ def show_steel_shares_window(user_email):
         messagebox.showerror("Error", "User not found.")
         return
     user_data = users[user_email]
-    shares_data = user_data.get("steel_shares", {})
+    shares_data = {c: instruments.shares_owned(user_data, c) for c in STEEL_COMPANIES}
     win = tk.Toplevel(root)
     win.title(f"{user_data['name']}'s Steel Portfolio")
     win.geometry("520x500")
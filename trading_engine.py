@@ -0,0 +1,179 @@
+"""
+trading_engine.py
+
+UI-free buy/sell logic shared by the Tkinter app (final.py) and the
+Streamlit app.  Front ends only collect input and show the result:
+
+    engine = TradingEngine(ACCOUNTS, PRICES, {"shares": AUTO_COMPANIES, ...})
+    account = engine.buy("a@b.com", "Honda", 5)        # raises TradeError
+    fills = engine.batch_execute([Order("a@b.com", "BUY", "Honda", 5), ...])
+
+Every trade is stored with the repository's compare-and-swap, and a batch
+is committed in a single store transaction, so the engine can be driven
+and load-tested headlessly.  Signups and profit withdrawals go through the
+engine too, so it can keep the app-wide totals in aggregates.py current.
+
+Live prices are floats, so every amount and balance the engine stores is
+rounded to paise (money()); balances never pick up float noise such as
+45.56999999999999.
+"""
+
+from collections import namedtuple
+
+import aggregates
+import holdings
+from accounts import ConflictError  # re-exported for front ends
+
+BUY = "BUY"
+SELL = "SELL"
+
+Order = namedtuple("Order", ["email", "side", "symbol", "qty"])
+# ok=False fills carry the rejection reason in error and amount=0
+Fill = namedtuple("Fill", ["order", "ok", "amount", "error"])
+
+
+class TradeError(ValueError):
+    """A trade was rejected (bad input, not enough balance or shares)."""
+
+
+def money(amount):
+    """Round a rupee amount to paise (ints stay ints)."""
+    return round(amount, 2)
+
+
+class TradingEngine:
+    def __init__(self, repo, prices, buckets, totals=None):
+        """
+        repo     - accounts.AccountRepository
+        prices   - symbol -> unit price (read on every trade, so live updates apply)
+        buckets  - sector bucket name -> iterable of symbols, e.g. {"shares": AUTO_COMPANIES};
+                   only these symbols can be traded
+        totals   - aggregates.AppAggregates to keep current (default: the repository's)
+        """
+        self.repo = repo
+        self.prices = prices
+        self.totals = totals if totals is not None else aggregates.for_repository(repo)
+        self.tradeable = {symbol for symbols in buckets.values() for symbol in symbols}
+
+    # -- pricing / validation --
+    def price(self, symbol):
+        if symbol not in self.prices:
+            raise TradeError(f"Unknown company: {symbol}")
+        return self.prices[symbol]
+
+    def _check(self, order):
+        if order.side not in (BUY, SELL):
+            raise TradeError(f"Unknown order side: {order.side}")
+        if not isinstance(order.qty, int) or isinstance(order.qty, bool) or order.qty <= 0:
+            raise TradeError("Enter positive quantity.")
+        if order.symbol not in self.tradeable:
+            raise TradeError(f"Unknown company: {order.symbol}")
+
+    # -- mutation on a single account dict --
+    def _apply(self, account, order):
+        """Apply one order to an account dict in place; returns the cash amount moved."""
+        self._check(order)
+        price = self.price(order.symbol)
+        amount = money(price * order.qty)
+        position = holdings.decode_account(account)["holdings"]
+        if order.side == BUY:
+            if money(account["balance"]) < amount:
+                raise TradeError("Insufficient balance.")
+            account["balance"] = money(account["balance"] - amount)
+            position[order.symbol] = position.get(order.symbol) + order.qty
+            account.setdefault("last_buy_price", {})[order.symbol] = price
+        else:
+            if position.get(order.symbol) < order.qty:
+                raise TradeError("Not enough shares to sell.")
+            position[order.symbol] -= order.qty
+            account["balance"] = money(account["balance"] + amount)
+        return amount
+
+    def _execute(self, order):
+        moved = []
+        with self.totals.lock:
+            try:
+                account = self.repo.update(order.email, lambda account: moved.append(self._apply(account, order)))
+            except KeyError:
+                raise TradeError("User not found.")
+            self.totals.trade(order.side, order.symbol, order.qty, moved[-1])
+        return account, moved[-1]
+
+    # -- public API --
+    def execute(self, email, side, symbol, qty):
+        """Buy or sell; returns (stored account, cash amount moved at the price traded)."""
+        return self._execute(Order(email, side, symbol, qty))
+
+    def buy(self, email, symbol, qty):
+        """Buy qty shares for email; returns the stored account."""
+        return self._execute(Order(email, BUY, symbol, qty))[0]
+
+    def sell(self, email, symbol, qty):
+        """Sell qty shares for email; returns the stored account."""
+        return self._execute(Order(email, SELL, symbol, qty))[0]
+
+    def signup(self, email, account):
+        """Create an account; False if the email is already taken."""
+        with self.totals.lock:
+            if not self.repo.create(email, account):
+                return False
+            self.totals.signup(account)
+        return True
+
+    def withdraw(self, email, amount):
+        """Credit withdrawn profit to email's trading balance; returns the stored account."""
+        amount = money(amount)
+        if amount <= 0:
+            raise TradeError("Nothing to withdraw.")
+
+        def credit(account):
+            account["balance"] = money(account["balance"] + amount)
+
+        with self.totals.lock:
+            try:
+                account = self.repo.update(email, credit)
+            except KeyError:
+                raise TradeError("User not found.")
+            self.totals.withdrawal(amount)
+        return account
+
+    def batch_execute(self, orders):
+        """Apply many orders in order and commit them in one store transaction.
+
+        Rejected orders (bad input, insufficient funds/shares at that point
+        in the batch) don't touch the account and come back as ok=False
+        fills; everything else is committed together.  Unknown accounts are
+        rejected up front.  Raises ConflictError only if the
+        accounts keep changing underneath the batch.
+        """
+        orders = [o if isinstance(o, Order) else Order(*o) for o in orders]
+        known = [email for email in dict.fromkeys(o.email for o in orders) if self.repo.get(email) is not None]
+        fills = []
+
+        def apply_all(copies):
+            fills.clear()  # re-run from scratch after a conflict
+            for order in orders:
+                if order.email not in copies:
+                    fills.append(Fill(order, False, 0, "User not found."))
+                    continue
+                # Apply to a scratch copy so a rejected order leaves no partial change
+                account = copies[order.email]
+                scratch = holdings.copy_account(account)
+                try:
+                    amount = self._apply(scratch, order)
+                except TradeError as e:
+                    fills.append(Fill(order, False, 0, str(e)))
+                    continue
+                account.clear()
+                account.update(scratch)
+                fills.append(Fill(order, True, amount, None))
+
+        with self.totals.lock:
+            if known:
+                self.repo.update_many(known, apply_all)
+            else:
+                apply_all({})
+            for fill in fills:
+                if fill.ok:
+                    self.totals.trade(fill.order.side, fill.order.symbol, fill.order.qty, fill.amount)
+        return list(fills)
@@ -0,0 +1,181 @@
+"""
+valuation.py
+
+Portfolio valuation for every account at once.
+
+All accounts' holdings are stacked into one users x symbols int64 matrix
+(columns in instruments.PRICE_SLOTS order, rows in account order), so
+valuing everyone is a single matrix-vector product against the price
+vector instead of a Python loop per user and sector:
+
+    book = PortfolioMatrix(ACCOUNTS.all())
+    book.user_values(PRICES)      # per-user portfolio value
+    book.sector_values(PRICES)    # users x sectors value
+    book.totals(PRICES)           # app-wide figures (fpe.app_point_estimation)
+
+Prices are read when a method is called, so live price updates apply.
+
+Building the matrix copies every account's holdings (about a second per
+million accounts), so for_repository(repo) keeps one LiveBook per repository: the
+matrix is built once and then kept current row by row from the
+repository's change notifications.
+
+    book = valuation.for_repository(ACCOUNTS)
+    book.read(lambda m: m.totals(PRICES))
+
+benchmarks/bench_valuation.py times the build, the per-account update and
+the valuation against the old loops.
+"""
+
+import threading
+
+import numpy as np
+
+import holdings
+import instruments
+
+N_SLOTS = holdings.N_SLOTS
+SECTOR_KEYS = [s.key for s in instruments.SECTORS]
+
+# symbols x sectors one-hot; holdings @ SECTOR_ONEHOT gives shares per sector
+SECTOR_ONEHOT = np.zeros((N_SLOTS, len(SECTOR_KEYS)), dtype=np.int64)
+for _inst in instruments.INSTRUMENTS.values():
+    SECTOR_ONEHOT[_inst.slot, SECTOR_KEYS.index(_inst.sector)] = 1
+del _inst
+
+
+def price_vector(prices):
+    """PRICE_SLOTS-ordered price vector (int64 while every price is an int, like the old sums)."""
+    return np.asarray([prices.get(symbol, 0) for symbol in instruments.PRICE_SLOTS])
+
+
+class PortfolioMatrix:
+    def __init__(self, users):
+        """users - email -> account, as returned by AccountRepository.all()"""
+        self.emails = list(users)
+        self.row_of = {email: i for i, email in enumerate(self.emails)}
+        accounts = [holdings.decode_account(user) for user in users.values()]
+        # Each Holdings is already a flat int64 buffer, so this is one memcpy per account
+        self._set_rows(np.frombuffer(b"".join(a["holdings"].qty for a in accounts),
+                                     dtype=np.int64).reshape(len(accounts), N_SLOTS).copy(),
+                       np.asarray([a.get("balance", 0) for a in accounts]))
+
+    @classmethod
+    def from_arrays(cls, emails, holdings_matrix, balances):
+        book = cls.__new__(cls)
+        book.emails = list(emails)
+        book.row_of = {email: i for i, email in enumerate(book.emails)}
+        book._set_rows(np.asarray(holdings_matrix, dtype=np.int64), np.asarray(balances))
+        return book
+
+    def _set_rows(self, qty, balances):
+        # holdings/balances are views of the first len(self) rows of larger buffers,
+        # so new accounts can be appended without copying the matrix every time
+        self._qty = qty
+        self._balances = balances
+        self.holdings = qty[:len(self.emails)]
+        self.balances = balances[:len(self.emails)]
+
+    def __len__(self):
+        return len(self.emails)
+
+    def update(self, email, account):
+        """Refresh one account's row after a change; a new email gets a new row."""
+        i = self.row_of.get(email)
+        if i is None:
+            i = len(self.emails)
+            if i == len(self._qty):
+                capacity = max(16, 2 * i)
+                qty = np.zeros((capacity, N_SLOTS), dtype=np.int64)
+                qty[:i] = self._qty[:i]
+                balances = np.zeros(capacity, dtype=self._balances.dtype)
+                balances[:i] = self._balances[:i]
+                self._qty, self._balances = qty, balances
+            self.emails.append(email)
+            self.row_of[email] = i
+        self._qty[i] = holdings.decode_account(account)["holdings"].as_numpy()
+        balance = account.get("balance", 0)
+        if isinstance(balance, float) and self._balances.dtype.kind != "f":
+            self._balances = self._balances.astype(np.float64)
+        self._balances[i] = balance
+        self._set_rows(self._qty, self._balances)
+
+    # -- valuation --
+    def user_values(self, prices):
+        """Portfolio value per account, in self.emails order."""
+        return self.holdings @ price_vector(prices)
+
+    def sector_counts(self):
+        """users x sectors share counts (columns in SECTOR_KEYS order)."""
+        return self.holdings @ SECTOR_ONEHOT
+
+    def sector_values(self, prices):
+        """users x sectors portfolio value (columns in SECTOR_KEYS order)."""
+        return self.holdings @ (price_vector(prices)[:, None] * SECTOR_ONEHOT)
+
+    def outstanding(self):
+        """Shares held across all accounts, per symbol slot."""
+        return self.holdings.sum(axis=0)
+
+    def totals(self, prices):
+        total_balance = self.balances.sum().item() if len(self) else 0
+        total_portfolio_value = (self.outstanding() @ price_vector(prices)).item()
+        return {
+            "num_users": len(self),
+            "total_balance": total_balance,
+            "total_portfolio_value": total_portfolio_value,
+            "total_money_in_app": total_balance + total_portfolio_value,
+        }
+
+    def rows(self, prices):
+        """(email, sector counts, sector values, total value) per account, as plain Python numbers."""
+        counts = self.sector_counts().tolist()
+        values = self.sector_values(prices)
+        totals = values.sum(axis=1).tolist()
+        return zip(self.emails, counts, values.tolist(), totals)
+
+
+class LiveBook:
+    """A PortfolioMatrix kept current from an AccountRepository's change notifications."""
+
+    def __init__(self, repo):
+        self.repo = repo
+        self._lock = threading.Lock()
+        self._book = None
+        self.version = 0    # bumped on every change, for callers caching derived values
+        repo.subscribe(self._changed)
+
+    def _changed(self, email, account):
+        with self._lock:
+            if email is None:
+                self._book = None  # reloaded wholesale; rebuild on next read
+            elif self._book is not None:
+                self._book.update(email, account)
+            self.version += 1
+
+    def read(self, fn, users=None):
+        """fn(matrix) with the matrix current and held still while fn runs.
+
+        users - repo.all(), if the caller already has it (it must be fetched
+        without holding any lock a change listener takes).
+        """
+        # Read the accounts before taking our lock: the repository may deliver
+        # change notifications (which take it) from inside all()
+        if users is None:
+            users = self.repo.all()
+        with self._lock:
+            if self._book is None:
+                self._book = PortfolioMatrix(dict(users))
+            return fn(self._book)
+
+
+_BOOKS = {}
+_BOOKS_LOCK = threading.Lock()
+
+
+def for_repository(repo):
+    with _BOOKS_LOCK:
+        book = _BOOKS.get(repo)
+        if book is None:
+            book = _BOOKS[repo] = LiveBook(repo)
+        return book